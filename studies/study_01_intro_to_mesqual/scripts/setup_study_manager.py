@@ -2,6 +2,7 @@ import os
 import glob
 import pypsa
 
+from vanilla.network_loading import load_networks_in_parallel, LazyNetwork, LazyNetworkPool
 from mesqual import StudyManager
 from mesqual_pypsa import PyPSADataset
 
@@ -33,22 +34,30 @@ def _get_attributes_from_name(model_name: str) -> dict[str, str | int]:
     return attributes
 
 
-def _get_dataset_from_nc_file_path(file_path: str) -> PyPSADataset:
+def _get_dataset_from_network(file_path: str, n: pypsa.Network | LazyNetwork) -> PyPSADataset:
     name = _get_name_from_path(file_path)
     attributes = _get_attributes_from_name(name)
-    n = pypsa.Network(file_path)
     return ScigridDEDataset(n, name=name, attributes=attributes)
 
 
-def get_scigrid_de_study_manager() -> StudyManager:
+def get_scigrid_de_study_manager(
+        max_workers: int = None,
+        lazy: bool = False,
+        max_loaded_networks: int = None,
+) -> StudyManager:
     study_folder = 'studies/study_01_intro_to_mesqual'
     networks_folder = os.path.join(study_folder, 'data/networks_scigrid_de')
     network_files = sorted(glob.glob(os.path.join(networks_folder, '*.nc')))
+    if lazy:
+        pool = LazyNetworkPool(max_loaded_networks) if max_loaded_networks else None
+        networks = [LazyNetwork(f, pool=pool) for f in network_files]
+    else:
+        networks = load_networks_in_parallel(network_files, max_workers=max_workers)
 
     study_manager = StudyManager.factory_from_scenarios(
         scenarios=[
-            _get_dataset_from_nc_file_path(f)
-            for f in network_files
+            _get_dataset_from_network(f, n)
+            for f, n in zip(network_files, networks)
         ],
         comparisons=[(_get_name_from_path(f), 'base') for f in network_files if not f.endswith('base.nc')],
         export_folder=os.path.join(study_folder, 'dvc/output'),
@@ -1,4 +1,5 @@
 from typing import TYPE_CHECKING
+from functools import lru_cache
 import os
 import pandas as pd
 import geopandas as gpd
@@ -13,18 +14,44 @@ if TYPE_CHECKING:
 
 
 _PATH_TO_GEOJSON = os.path.join('studies/study_01_intro_to_mesqual/data/DE_control_areas.geojson')
+_PATH_TO_GEOPARQUET = _PATH_TO_GEOJSON.replace('.geojson', '.parquet')
+_PROJECTED_CRS = 'EPSG:3857'
 
 
-def _get_control_area_gdf() -> gpd.GeoDataFrame:
+@lru_cache(maxsize=1)
+def get_control_area_gdf() -> gpd.GeoDataFrame:
+    """
+    Control area geometries, read on first use and shared by all datasets of the process.
+
+    The parsed GeoJSON is persisted as GeoParquet next to the source file, so subsequent
+    processes skip the GeoJSON parse as long as the GeoJSON is not modified.
+    """
+    if _geoparquet_is_up_to_date():
+        return gpd.read_parquet(_PATH_TO_GEOPARQUET)
+
     gdf = gpd.read_file(_PATH_TO_GEOJSON)
     gdf = gdf.rename(columns={'tso': 'control_area'})
     gdf = gdf.set_index('control_area')
     gdf = gdf.set_crs(epsg=4326)
+    try:
+        gdf.to_parquet(_PATH_TO_GEOPARQUET)
+    except (OSError, ImportError):
+        pass  # persisting is only an optimization, e.g. not possible in read-only checkouts
     return gdf
 
 
+def _geoparquet_is_up_to_date() -> bool:
+    if not os.path.exists(_PATH_TO_GEOPARQUET):
+        return False
+    return os.path.getmtime(_PATH_TO_GEOPARQUET) >= os.path.getmtime(_PATH_TO_GEOJSON)
+
+
+@lru_cache(maxsize=1)
+def _get_projected_control_area_gdf() -> gpd.GeoDataFrame:
+    return get_control_area_gdf()[['geometry']].to_crs(_PROJECTED_CRS)
+
+
 class ControlAreaModelInterpreter(PyPSAInterpreter):
-    GDF = _get_control_area_gdf()
 
     @property
     def accepted_flags(self) -> set[FlagType]:
@@ -37,7 +64,7 @@ class ControlAreaModelInterpreter(PyPSAInterpreter):
         # Due to the @flag_must_be_accepted decorator in the self.fetch method,
         # we can be sure that the flag is 'control_areas' at this point.
         # --> So no further flag logic is needed at this point.
-        return self.GDF
+        return get_control_area_gdf()
 
 
 class ScigridDEBusModelInterpreter(PyPSAModelInterpreter):
@@ -45,8 +72,8 @@ class ScigridDEBusModelInterpreter(PyPSAModelInterpreter):
     def accepted_flags(self) -> set[str]:
         return {'buses'}
 
-    def required_flags_for_flag(self, flag: FlagType) -> set[FlagType]:
-        return {'control_areas'}
+    def _required_flags_for_flag(self, flag: FlagType) -> set[FlagType]:
+        return super()._required_flags_for_flag(flag) | {'control_areas'}
 
     def _fetch(self, flag: str, effective_config: 'PyPSADatasetConfig', **kwargs) -> pd.Series | pd.DataFrame:
         df_buses = super()._fetch(flag, effective_config, **kwargs)
@@ -60,14 +87,15 @@ class ScigridDEBusModelInterpreter(PyPSAModelInterpreter):
 
         missing_mask = df_buses['control_area'].isna()
         if missing_mask.any():
-            projected_crs = 'EPSG:3857'
-            df_buses_proj = df_buses.to_crs(projected_crs)
-            df_control_area_proj = df_control_areas.to_crs(projected_crs)
-
-            def find_nearest_control_area(bus):
-                return df_control_area_proj.geometry.distance(bus.location).idxmin()
-
-            _missing_areas = df_buses_proj.loc[missing_mask].apply(find_nearest_control_area, axis=1)
-            df_buses.loc[missing_mask, 'control_area'] = _missing_areas
+            shared_control_areas = get_control_area_gdf()
+            if df_control_areas is shared_control_areas or df_control_areas.geometry.equals(shared_control_areas.geometry):
+                df_control_area_proj = _get_projected_control_area_gdf()
+            else:
+                df_control_area_proj = df_control_areas[['geometry']].to_crs(_PROJECTED_CRS)
+            df_missing_buses_proj = df_buses.loc[missing_mask, ['location']].to_crs(_PROJECTED_CRS)
+
+            nearest = gpd.sjoin_nearest(df_missing_buses_proj, df_control_area_proj.reset_index(), how='left')
+            nearest = nearest[~nearest.index.duplicated(keep='first')]  # equidistant areas yield multiple matches
+            df_buses.loc[missing_mask, 'control_area'] = nearest['control_area']
 
         return df_buses
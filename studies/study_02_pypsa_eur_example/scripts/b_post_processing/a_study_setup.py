@@ -1,32 +1,53 @@
 from pathlib import Path
-import pypsa
 
 from mesqual import StudyManager
-from mesqual_pypsa import PyPSADataset, PyPSADatasetConfig
 
-from studies.study_02_pypsa_eur_example.src.config import STUDY_FOLDER, StudyDatabase
-
-
-def get_study_manager() -> StudyManager:
-    db = _get_study_db()
+from vanilla.network_loading import load_networks_in_parallel, LazyNetwork, LazyNetworkPool
+from studies.study_02_pypsa_eur_example.src.config import STUDY_FOLDER, StudyDatabase, StudyDataset, STUDY_INTERPRETERS
+from studies.study_02_pypsa_eur_example.src.precision_policy import PrecisionPolicy, StudyDatasetConfig
+from studies.study_02_pypsa_eur_example.src.comparison_cache import ComparisonDeltaCache, enable_delta_cache
+
+SCENARIO_NAMES = ['base', 'high_res', 'low_res']
+
+
+def get_study_manager(
+        max_workers: int = None,
+        lazy: bool = False,
+        max_loaded_networks: int = None,
+        max_cache_size: int | str = None,
+        precision_policy: PrecisionPolicy = None,
+) -> StudyManager:
+    db = _get_study_db(max_cache_size)
+    network_paths = [_get_network_path(scen) for scen in SCENARIO_NAMES]
+    for scen, path in zip(SCENARIO_NAMES, network_paths):
+        db.register_source_file(scen, path)
+    if lazy:
+        pool = LazyNetworkPool(max_loaded_networks) if max_loaded_networks else None
+        networks = [LazyNetwork(path, pool=pool) for path in network_paths]
+    else:
+        networks = load_networks_in_parallel(network_paths, max_workers=max_workers)
+    config = StudyDatasetConfig(precision_policy=precision_policy)
+    scenarios = [
+        StudyDataset(
+            n,
+            name=scen,
+            database=db,
+            config=config,
+        )
+        for scen, n in zip(SCENARIO_NAMES, networks)
+    ]
     study = StudyManager.factory_from_scenarios(
-        scenarios=[
-            PyPSADataset(
-                pypsa.Network(_get_network_path(scen)),
-                name=scen,
-                database=db,
-            )
-            for scen in ['base', 'high_res', 'low_res']
-        ],
+        scenarios=scenarios,
         comparisons=[('high_res', 'base'), ('high_res', 'base')]
     )
+    enable_delta_cache(study.comp, ComparisonDeltaCache(db, config))
     return study
 
 
-def _get_study_db() -> StudyDatabase:
+def _get_study_db(max_cache_size: int | str = None) -> StudyDatabase:
     _db_path = STUDY_FOLDER.joinpath(f'dvc/networks/__pickleDB')
     _db_path.mkdir(exist_ok=True)
-    return StudyDatabase(_db_path)
+    return StudyDatabase(_db_path, interpreter_classes=STUDY_INTERPRETERS, max_bytes=max_cache_size)
 
 
 def _get_network_path(scenario_name: str) -> Path:
@@ -3,6 +3,7 @@ from pathlib import Path
 from mesqual import StudyManager
 from mesqual.visualizations import TimeSeriesDashboardGenerator
 
+from vanilla.parallel_fetch import fetch_in_parallel
 from studies.study_02_pypsa_eur_example.src.config import theme
 
 
@@ -13,7 +14,7 @@ class TradeBalanceTimeSeriesDashbaordGenerator:
     def save_figs(self, folder: Path):
         flag = f'countries_t.trade_balance_per_partner'
 
-        data = self._study.scen_comp.fetch(flag).xs('net_exp', level='variable', axis=1)
+        data = fetch_in_parallel(self._study.scen_comp, flag).xs('net_exp', level='variable', axis=1)
         countries = data.columns.get_level_values(-1).unique()
         countries = ['BE']  # demo only
 
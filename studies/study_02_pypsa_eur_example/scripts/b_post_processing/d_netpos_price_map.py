@@ -1,5 +1,5 @@
 import os
-from typing import List
+from typing import Any, List
 import numpy as np
 import folium
 
@@ -9,17 +9,30 @@ from mesqual.visualizations import folviz, valmap
 from mesqual.utils.folium_utils import set_background_color_of_map, MapCountryPlotter
 from mesqual.visualizations.folium_viz_system import PropertyMapper
 
+from vanilla.batch_styles import VectorizedColorscale, contrast_text_colors, rgb_to_hex
+from vanilla.fetch_planner import FetchPlanner
+from vanilla.kpi_batch import add_kpis_in_batch
+from vanilla.parallel_fetch import get_scenario_datasets
+from vanilla.shared_geojson_layer import SharedGeoJsonLayer
 from studies.study_02_pypsa_eur_example.src.config import STUDY_FOLDER, theme
+from studies.study_02_pypsa_eur_example.src.branch_flows import release_flow_context
 
 
 class KPISetup:
     """Sets up KPI definitions for prices, net positions, and flows."""
+    _country_flags = [
+        'countries_t.vol_weighted_marginal_price',
+        'countries_t.net_position',
+    ]
+    _flow_flag = 'country_borders_t.net_flow'
+    _model_flags = ['countries', 'country_borders']
 
     def __init__(self, study: StudyManager):
         self._study = study
 
     def run(self) -> None:
-        """Execute KPI setup: clear existing KPIs and add new definitions."""
+        """Execute KPI setup: prefetch all KPI flags, clear existing KPIs and add new definitions."""
+        self._prefetch_kpi_flags()
         self._clear_existing_kpis()
 
         country_kpi_defs = self._create_country_kpi_definitions()
@@ -27,19 +40,26 @@ class KPISetup:
 
         all_kpi_defs = country_kpi_defs + flow_kpi_defs
         self._add_kpis_to_study(all_kpi_defs)
+        self._release_flow_data()
+
+    def _prefetch_kpi_flags(self) -> None:
+        """Fetch all KPI flags and their dependencies in one planned pass over all scenarios."""
+        flags = self._country_flags + [self._flow_flag] + self._model_flags
+        FetchPlanner().prefetch(get_scenario_datasets(self._study.scen), flags)
+
+    def _release_flow_data(self) -> None:
+        """All flow-based KPIs are computed, so the shared line-flow data of the scenarios is no longer needed."""
+        for dataset in get_scenario_datasets(self._study.scen):
+            release_flow_context(dataset)
 
     def _clear_existing_kpis(self) -> None:
         self._study.scen.clear_kpi_collection_for_all_child_datasets()
         self._study.comp.clear_kpi_collection_for_all_child_datasets()
 
     def _create_country_kpi_definitions(self) -> list:
-        flags = [
-            'countries_t.vol_weighted_marginal_price',
-            'countries_t.net_position',
-        ]
         return (
             kpis.FlagAggKPIBuilder()
-            .for_flags(flags)
+            .for_flags(self._country_flags)
             .for_all_objects()
             .with_aggregations([kpis.Aggregations.Mean])
             .build()
@@ -48,7 +68,7 @@ class KPISetup:
     def _create_flow_kpi_definitions(self) -> list:
         return (
             kpis.FlagAggKPIBuilder()
-            .for_flag('country_borders_t.net_flow')
+            .for_flag(self._flow_flag)
             .for_objects_with_model_properties(properties=dict(name_is_alphabetically_sorted=True))
             .with_aggregations([kpis.Aggregations.Mean])
             .build()
@@ -56,9 +76,9 @@ class KPISetup:
 
     def _add_kpis_to_study(self, scenario_defs: list = None, comparison_defs: list = None) -> None:
         if scenario_defs:
-            self._study.scen.add_kpis_from_definitions_to_all_child_datasets(scenario_defs)
+            add_kpis_in_batch(self._study.scen, scenario_defs)
         if comparison_defs:
-            self._study.comp.add_kpis_from_definitions_to_all_child_datasets(comparison_defs)
+            add_kpis_in_batch(self._study.comp, comparison_defs)
 
 
 class MapGenerator(folviz.CustomKPIGroupGenerator):
@@ -69,7 +89,15 @@ class MapGenerator(folviz.CustomKPIGroupGenerator):
 
     Flows appear in both groups. Each KPI type has its own visualization style.
     All generator setup and legend management is encapsulated within this class.
+
+    Styles (colors, arrow sizes, text colors) are resolved in batch: all KPI values of one flag are mapped
+    with one vectorized colorscale lookup and one np.interp call, and the generators only look up the
+    precomputed style of each KPI.
     """
+    _price_range = (0, 100)
+    _netpos_range = (-15_000, 15_000)
+    _flow_range = (0, 5_000)
+    _flow_width_stops = ([0, 9.9, 10, 5_000], [1, 1, 10, 30])
 
     def __init__(self):
         """Initialize colormaps and generators for all KPI types."""
@@ -77,14 +105,25 @@ class MapGenerator(folviz.CustomKPIGroupGenerator):
         self.netpos_colormap = self._create_netpos_colormap()
         self.flow_colormap = self._create_flow_colormap()
 
+        self._price_scale = VectorizedColorscale(self.price_colormap, self._price_range)
+        self._netpos_scale = VectorizedColorscale(self.netpos_colormap, self._netpos_range)
+        self._flow_scale = VectorizedColorscale(self.flow_colormap, self._flow_range)
+        self._styles: dict[int, tuple[KPI, dict[str, Any]]] = dict()
+
         self.price_generators = self._get_price_generators()
         self.net_position_generators = self._get_net_position_generators()
         self.flow_generators = self._get_flow_arrow_generators()
 
+        self._generators_by_flag: dict[str, List[folviz.FoliumObjectGenerator]] = {
+            'countries_t.vol_weighted_marginal_price': self.price_generators,
+            'countries_t.net_position': self.net_position_generators,
+            'country_borders_t.net_flow': self.flow_generators,
+        }
+
     def _create_price_colormap(self) -> valmap.SegmentedContinuousColorscale:
         return valmap.SegmentedContinuousColorscale(
             segments={
-                (0, 100): theme.colors.sequential.default,
+                self._price_range: theme.colors.sequential.default,
             },
             nan_fallback='#A2A2A2',
         )
@@ -92,7 +131,7 @@ class MapGenerator(folviz.CustomKPIGroupGenerator):
     def _create_netpos_colormap(self) -> valmap.SegmentedContinuousColorscale:
         return valmap.SegmentedContinuousColorscale(
             segments={
-                (-15_000, 15_000): theme.colors.diverging.teal_amber[::-1],
+                self._netpos_range: theme.colors.diverging.teal_amber[::-1],
             },
             nan_fallback='#A2A2A2',
         )
@@ -100,7 +139,7 @@ class MapGenerator(folviz.CustomKPIGroupGenerator):
     def _create_flow_colormap(self) -> valmap.SegmentedContinuousColorscale:
         return valmap.SegmentedContinuousColorscale(
             segments={
-                (0, 5_000): ['#101010', '#000000'],
+                self._flow_range: ['#101010', '#000000'],
             },
             nan_fallback='#A2A2A2',
         )
@@ -108,7 +147,7 @@ class MapGenerator(folviz.CustomKPIGroupGenerator):
     def _get_price_generators(self) -> List[folviz.FoliumObjectGenerator]:
         area_gen = folviz.AreaGenerator(
             folviz.AreaFeatureResolver(
-                fill_color=folviz.PropertyMapper.from_kpi_value(self.price_colormap),
+                fill_color=self._style_mapper('fill_color'),
                 fill_opacity=1.0,
                 border_color='#ffffff',
                 border_width=2,
@@ -116,14 +155,14 @@ class MapGenerator(folviz.CustomKPIGroupGenerator):
             )
         )
 
-        text_gen = self._create_area_text_generator(self.price_colormap)
+        text_gen = self._create_area_text_generator()
 
         return [area_gen, text_gen]
 
     def _get_net_position_generators(self) -> List[folviz.FoliumObjectGenerator]:
         area_gen = folviz.AreaGenerator(
             folviz.AreaFeatureResolver(
-                fill_color=folviz.PropertyMapper.from_kpi_value(self.netpos_colormap),
+                fill_color=self._style_mapper('fill_color'),
                 fill_opacity=1.0,
                 border_color='#ffffff',
                 border_width=2,
@@ -131,24 +170,21 @@ class MapGenerator(folviz.CustomKPIGroupGenerator):
             )
         )
 
-        text_gen = self._create_area_text_generator(self.netpos_colormap)
+        text_gen = self._create_area_text_generator()
 
         return [area_gen, text_gen]
 
     def _get_flow_arrow_generators(self) -> List[folviz.FoliumObjectGenerator]:
         from captain_arro import ArrowTypeEnum
 
-        width_mapping = lambda x: np.interp(x, [0, 9.9, 10, 5_000], [1, 1, 10, 30])
-        height_mapping = lambda x: width_mapping(x * 4 / 3)
-
         arrow_gen = folviz.ArrowIconGenerator(
             folviz.ArrowIconFeatureResolver(
                 arrow_type=ArrowTypeEnum.MOVING_FLOW_ARROW,
-                color=folviz.PropertyMapper.from_kpi_value(self.flow_colormap, use_abs_kpi_value=True),
+                color=self._style_mapper('color'),
                 reverse_direction=folviz.PropertyMapper.from_kpi_value(lambda v: v < 0),
                 stroke_width=2,
-                width=folviz.PropertyMapper.from_kpi_value(width_mapping, use_abs_kpi_value=True),
-                height=folviz.PropertyMapper.from_kpi_value(height_mapping, use_abs_kpi_value=True),
+                width=self._style_mapper('width'),
+                height=self._style_mapper('height'),
                 speed_in_duration_seconds=4,
                 speed_in_px_per_second=None,
                 num_arrows=4,
@@ -157,12 +193,11 @@ class MapGenerator(folviz.CustomKPIGroupGenerator):
 
         return [arrow_gen]
 
-    def _create_area_text_generator(self, colormap) -> folviz.TextOverlayGenerator:
+    def _create_area_text_generator(self) -> folviz.TextOverlayGenerator:
         """
         Create text overlay generator with color-adaptive text.
 
-        Args:
-            colormap: Colormap to use for determining text color contrast
+        The text color contrasts with the precomputed fill color of the area.
 
         Returns:
             Configured TextOverlayGenerator
@@ -170,22 +205,63 @@ class MapGenerator(folviz.CustomKPIGroupGenerator):
         def format_text(item: folviz.KPIDataItem) -> str:
             return f'{round(item.kpi.value)}'
 
-        def text_color(item: folviz.KPIDataItem) -> str:
-            area_color = colormap(item.kpi.value)
-            r, g, b = [int(area_color[i:i + 2], 16) for i in (1, 3, 5)]
-            is_dark = (0.299 * r + 0.587 * g + 0.114 * b) < 150
-            return '#F2F2F2' if is_dark else '#194D6C'
-
         return folviz.TextOverlayGenerator(
             folviz.TextOverlayFeatureResolver(
                 text_print_content=folviz.PropertyMapper(format_text),
                 font_size='10pt',
-                text_color=folviz.PropertyMapper(text_color),
+                text_color=self._style_mapper('text_color'),
                 shadow_color=None,
                 location=folviz.PropertyMapper.from_item_attr('projection_point')
             )
         )
 
+    def _style_mapper(self, key: str) -> folviz.PropertyMapper:
+        """PropertyMapper that reads one entry of the precomputed style of the item's KPI."""
+        return folviz.PropertyMapper(lambda item: self.get_style(item.kpi)[key])
+
+    def get_style(self, kpi: KPI) -> dict[str, Any]:
+        """Precomputed style of the KPI; KPIs that were not part of a resolved group are resolved on demand."""
+        entry = self._styles.get(id(kpi))
+        if entry is None or entry[0] is not kpi:
+            self.resolve_styles([kpi])
+            entry = self._styles[id(kpi)]
+        return entry[1]
+
+    def resolve_styles(self, kpis_to_style: list[KPI]) -> None:
+        """
+        Compute the styles of all given KPIs in batch, one vectorized pass per flag.
+
+        Area KPIs (prices, net positions) get a fill_color and a contrasting text_color,
+        flow KPIs get an arrow color, width and height based on the absolute flow.
+        """
+        kpis_by_flag: dict[str, list[KPI]] = dict()
+        for kpi in kpis_to_style:
+            kpis_by_flag.setdefault(kpi.attributes.flag, []).append(kpi)
+
+        for flag, flag_kpis in kpis_by_flag.items():
+            values = np.array([kpi.value for kpi in flag_kpis], dtype=float)
+            generators = self.get_generators_for_kpi(flag_kpis[0])
+
+            if generators is self.flow_generators:
+                abs_values = np.abs(values)
+                sizes = np.interp(np.concatenate([abs_values, abs_values * 4 / 3]), *self._flow_width_stops)
+                styles = dict(
+                    color=self._flow_scale(abs_values),
+                    width=sizes[:len(values)],
+                    height=sizes[len(values):],
+                )
+            else:
+                scale = self._price_scale if generators is self.price_generators else self._netpos_scale
+                rgb = scale.rgb(values)
+                styles = dict(
+                    fill_color=rgb_to_hex(rgb),
+                    text_color=contrast_text_colors(rgb),
+                )
+
+            columns = {key: array.tolist() for key, array in styles.items()}
+            for i, kpi in enumerate(flag_kpis):
+                self._styles[id(kpi)] = (kpi, {key: column[i] for key, column in columns.items()})
+
     def add_legends_to_map(self, map_obj: folium.Map) -> None:
         price_legend = folviz.legends.ContinuousColorscaleLegend(
             mapping=self.price_colormap,
@@ -252,6 +328,7 @@ class MapGenerator(folviz.CustomKPIGroupGenerator):
             List of (group_name, kpi_collection) tuples
         """
         groups = []
+        kpis_to_style = []
 
         for dataset in source.scen.dataset_iterator:
             kpi_col: KPICollection = dataset.kpi_collection
@@ -259,6 +336,7 @@ class MapGenerator(folviz.CustomKPIGroupGenerator):
             price_kpis = kpi_col.filter(flag='countries_t.vol_weighted_marginal_price')
             netpos_kpis = kpi_col.filter(flag='countries_t.net_position')
             flow_kpis = kpi_col.filter(flag='country_borders_t.net_flow')
+            kpis_to_style.extend(price_kpis._kpis + netpos_kpis._kpis + flow_kpis._kpis)
 
             agg = price_kpis._kpis[0].attributes.aggregation if price_kpis else 'mean'
 
@@ -272,11 +350,56 @@ class MapGenerator(folviz.CustomKPIGroupGenerator):
                 group_name = f"Net Positions - {dataset.name} [{agg}]"
                 groups.append((group_name, netpos_group))
 
+        self.resolve_styles(kpis_to_style)
         return list(sorted(groups))
 
+    def add_shared_layer_to_map(self, source: StudyManager, map_obj: folium.Map) -> SharedGeoJsonLayer:
+        """
+        Compact alternative to generate_and_add_feature_groups_to_map for maps with many datasets.
+
+        Instead of one feature group with a full copy of all areas and arrows per group, the country
+        geometries and border arrow positions are written once into a SharedGeoJsonLayer, and each group
+        only adds its precomputed styles. The groups are switched with a select box on the map.
+        """
+        groups = self.create_kpi_groups_with_names(source)
+        dataset = source.scen.get_dataset()
+        countries = dataset.fetch('countries')
+        country_borders = dataset.fetch('country_borders')
+        flow_borders = {
+            kpi.attributes.object_name
+            for _, kpi_collection in groups
+            for kpi in kpi_collection._kpis
+            if self.get_generators_for_kpi(kpi) is self.flow_generators
+        }
+
+        layer = SharedGeoJsonLayer(
+            areas=countries,
+            arrows=country_borders.loc[country_borders.index.isin(flow_borders)],
+            border_color='#ffffff',
+            border_width=2,
+            font_size='10pt',
+        )
+        for group_name, kpi_collection in groups:
+            area_styles, arrow_styles = dict(), dict()
+            for kpi in kpi_collection._kpis:
+                style = self.get_style(kpi)
+                if self.get_generators_for_kpi(kpi) is self.flow_generators:
+                    arrow_styles[kpi.attributes.object_name] = dict(style, reverse=kpi.value < 0)
+                else:
+                    area_styles[kpi.attributes.object_name] = dict(style, value=kpi.value)
+            layer.add_group(group_name, area_styles=area_styles, arrow_styles=arrow_styles)
+        layer.add_to(map_obj)
+        return layer
+
     def get_generators_for_kpi(self, kpi: KPI) -> List[folviz.FoliumObjectGenerator]:
         flag = kpi.attributes.flag
+        generators = self._generators_by_flag.get(flag)
+        if generators is None:
+            generators = self._resolve_generators_for_flag(flag)
+            self._generators_by_flag[flag] = generators
+        return generators
 
+    def _resolve_generators_for_flag(self, flag: str) -> List[folviz.FoliumObjectGenerator]:
         if 'vol_weighted_marginal_price' in flag:
             return self.price_generators
 
@@ -307,6 +430,10 @@ if __name__ == '__main__':
     study: StudyManager
     (study, )
 
+    # Compact output: geometries are written once and restyled per group in the browser.
+    # Recommended for studies with many scenarios, where the regular output grows to hundreds of MB.
+    use_shared_layer = False
+
     output_folder = STUDY_FOLDER.joinpath('dvc/output/figs_map')
     os.makedirs(output_folder, exist_ok=True)
 
@@ -314,7 +441,10 @@ if __name__ == '__main__':
     map_gen = MapGenerator()
     m = map_gen.initialize_map(study)
     map_gen.add_legends_to_map(m)
-    map_gen.generate_and_add_feature_groups_to_map(source=study, map_obj=m, show='first')
+    if use_shared_layer:
+        map_gen.add_shared_layer_to_map(source=study, map_obj=m)
+    else:
+        map_gen.generate_and_add_feature_groups_to_map(source=study, map_obj=m, show='first')
     map_gen.add_non_physical_interconnector_cables_to_map(study, m)
 
     # Add layer control and save
@@ -0,0 +1,219 @@
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Sequence
+
+import numpy as np
+import pandas as pd
+
+from vanilla.fetch_memo import config_key
+from studies.study_02_pypsa_eur_example.src.snapshot_windows import SnapshotWindow, snapshot_window_kwargs
+
+if TYPE_CHECKING:
+    from mesqual.typevars import DatasetConfigType
+    from mesqual_pypsa import PyPSADataset
+    from mesqual.energy_data_handling import NetworkLineFlowsData, RegionalTradeBalanceCalculator, BorderFlowCalculator
+
+
+class BranchFlowBlock:
+    """
+    Side-0 and side-1 flows of all branch types in two preallocated (snapshots × branches) arrays.
+
+    The per-type frames (lines_t, links_t, transformers_t) are copied into the arrays once, in a single pass
+    over both sides. p0() and p1() return DataFrames that are views on the arrays, so serving both flags
+    costs one copy of the branch time series instead of one pd.concat per side. Each side is a separate
+    array, so a served frame does not keep the other side alive; release() drops the block's own reference.
+
+    Args:
+        p0_frames: Side-0 flow frames (snapshots × branches), one per branch type.
+        p1_frames: Side-1 flow frames, in the same order as p0_frames.
+        dtype: dtype of the arrays. float32 halves the memory footprint at the cost of precision.
+        memmap_folder: If given, the arrays are backed by anonymous temporary files in this folder
+            instead of RAM.
+    """
+
+    def __init__(
+            self,
+            p0_frames: Sequence[pd.DataFrame],
+            p1_frames: Sequence[pd.DataFrame],
+            dtype: np.dtype | type = np.float64,
+            memmap_folder: str = None,
+    ):
+        if len(p0_frames) != len(p1_frames):
+            raise ValueError('Need one p1 frame per p0 frame.')
+
+        self.index = p0_frames[0].index
+        column_sets = [p0.columns.union(p1.columns, sort=False) for p0, p1 in zip(p0_frames, p1_frames)]
+        self.columns = column_sets[0].append(column_sets[1:]) if len(column_sets) > 1 else column_sets[0]
+        self.columns = self.columns.rename('Branch')
+        self._dtype = np.dtype(dtype)
+
+        shape = (len(self.index), len(self.columns))
+        if memmap_folder is None:
+            self._sides = [np.empty(shape, dtype=dtype) for _ in range(2)]
+        else:
+            self._sides = [
+                np.memmap(tempfile.TemporaryFile(dir=memmap_folder), dtype=dtype, mode='w+', shape=shape)
+                for _ in range(2)
+            ]
+
+        start = 0
+        for p0, p1, columns in zip(p0_frames, p1_frames, column_sets):
+            stop = start + len(columns)
+            for side, df in enumerate([p0, p1]):
+                if not (df.columns.equals(columns) and df.index.equals(self.index)):
+                    df = df.reindex(index=self.index, columns=columns)
+                self._sides[side][:, start:stop] = df.to_numpy()
+            start = stop
+
+    @property
+    def dtype(self) -> np.dtype:
+        return self._dtype
+
+    @property
+    def nbytes(self) -> int:
+        return sum(side.nbytes for side in self._sides if side is not None)
+
+    def p0(self) -> pd.DataFrame:
+        return self._side_frame(0)
+
+    def p1(self) -> pd.DataFrame:
+        return self._side_frame(1)
+
+    def release(self, side: int) -> None:
+        """Drops the block's reference to one side; frames served before keep their data."""
+        self._sides[side] = None
+
+    def is_released(self, side: int) -> bool:
+        return self._sides[side] is None
+
+    def _side_frame(self, side: int) -> pd.DataFrame:
+        if self._sides[side] is None:
+            raise ValueError(f'Side {side} of the block has already been released.')
+        return pd.DataFrame(self._sides[side], index=self.index, columns=self.columns, copy=False)
+
+
+class FlowContext:
+    """
+    Flow-derived building blocks of one dataset, built on first use and shared by all flow-based interpreters.
+
+    The line-flow data (from branches_t.p0 / branches_t.p1) and the branch→country calculators are otherwise
+    rebuilt by every interpreter that needs them (net position, trade balance per partner, border flows).
+
+    Use get_flow_context(dataset, config=...) instead of instantiating the class directly, and
+    release_flow_context(dataset) once the flow-based flags are computed.
+
+    Args:
+        dataset: Dataset the flows are fetched from.
+        snapshot_window: Optional (start, stop) window; only the line-flow data of the window is built.
+        config: Dataset config passed on to all fetches, e.g. the interpreter's effective_config.
+        topology_context: Context of the full horizon to take the (time-independent) calculators from.
+    """
+
+    def __init__(
+            self,
+            dataset: 'PyPSADataset',
+            snapshot_window: SnapshotWindow = None,
+            config: 'DatasetConfigType' = None,
+            topology_context: 'FlowContext' = None,
+    ):
+        self._dataset = weakref.proxy(dataset)
+        self._lock = threading.RLock()
+        self.snapshot_window = snapshot_window
+        self._config = config
+        self._topology_context = topology_context
+
+    def release(self) -> None:
+        """Drops the cached line-flow data and calculators; they are rebuilt on their next use."""
+        with self._lock:
+            for name in ('line_flow_data', 'trade_balance_calculator', 'border_flow_calculator'):
+                self.__dict__.pop(name, None)
+
+    @cached_property
+    def line_flow_data(self) -> 'NetworkLineFlowsData':
+        from mesqual.energy_data_handling import NetworkLineFlowsData
+        with self._lock:
+            window_kwargs = snapshot_window_kwargs(self.snapshot_window)
+            return NetworkLineFlowsData.from_nodal_net_injection(
+                node_a_net_injection=self._dataset.fetch('branches_t.p0', self._config, **window_kwargs),
+                node_b_net_injection=self._dataset.fetch('branches_t.p1', self._config, **window_kwargs),
+            )
+
+    @cached_property
+    def trade_balance_calculator(self) -> 'RegionalTradeBalanceCalculator':
+        from mesqual.energy_data_handling import RegionalTradeBalanceCalculator
+        if self._topology_context is not None:
+            return self._topology_context.trade_balance_calculator
+        with self._lock:
+            return RegionalTradeBalanceCalculator(
+                self._dataset.fetch('branches', self._config),
+                self._dataset.fetch('buses', self._config),
+                agg_region_column='country',
+                node_from_col='bus0',
+                node_to_col='bus1',
+            )
+
+    @cached_property
+    def border_flow_calculator(self) -> 'BorderFlowCalculator':
+        from mesqual.energy_data_handling import BorderFlowCalculator
+        if self._topology_context is not None:
+            return self._topology_context.border_flow_calculator
+        with self._lock:
+            return BorderFlowCalculator(
+                self._dataset.fetch('country_borders', self._config),
+                self._dataset.fetch('branches', self._config),
+                self._dataset.fetch('buses', self._config),
+                'country',
+                'bus0',
+                'bus1',
+            )
+
+
+_FLOW_CONTEXTS_ATTRIBUTE = '_flow_contexts'
+_FLOW_CONTEXTS_LOCK = threading.Lock()
+_MAX_FLOW_CONTEXTS_PER_DATASET = 2
+
+
+def get_flow_context(
+        dataset: 'PyPSADataset',
+        snapshot_window: SnapshotWindow = None,
+        config: 'DatasetConfigType' = None,
+) -> FlowContext:
+    """The FlowContext of the given dataset and config.
+
+    The context is stored on the dataset, so it is shared by all interpreters of the dataset and never outlives
+    it. Call release_flow_context(dataset) to free its data earlier. With a snapshot_window, a short-lived
+    context for that window is returned, which shares the calculators of the dataset's full-horizon context.
+
+    Contexts are keyed by the content of the config (see vanilla.fetch_memo.config_key), so the effective
+    configs created per fetch share one context. At most _MAX_FLOW_CONTEXTS_PER_DATASET contexts are kept per
+    dataset; the least recently used one is released when another config comes along.
+    """
+    if snapshot_window is not None:
+        topology_context = get_flow_context(dataset, config=config)
+        return FlowContext(dataset, snapshot_window, config, topology_context=topology_context)
+    key = config_key(config)
+    evicted = []
+    with _FLOW_CONTEXTS_LOCK:
+        contexts: OrderedDict[Any, FlowContext] = vars(dataset).setdefault(_FLOW_CONTEXTS_ATTRIBUTE, OrderedDict())
+        context = contexts.get(key)
+        if context is None:
+            context = FlowContext(dataset, config=config)
+            contexts[key] = context
+            while len(contexts) > _MAX_FLOW_CONTEXTS_PER_DATASET:
+                evicted.append(contexts.popitem(last=False)[1])
+        else:
+            contexts.move_to_end(key)
+    for evicted_context in evicted:
+        evicted_context.release()
+    return context
+
+
+def release_flow_context(dataset: 'PyPSADataset') -> None:
+    """Drops all flow contexts of the dataset, e.g. after all flow-based flags have been fetched."""
+    with _FLOW_CONTEXTS_LOCK:
+        contexts = vars(dataset).pop(_FLOW_CONTEXTS_ATTRIBUTE, dict())
+    for context in contexts.values():
+        context.release()
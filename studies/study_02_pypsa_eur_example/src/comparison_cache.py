@@ -0,0 +1,185 @@
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable
+
+import pandas as pd
+
+from vanilla.fetch_memo import config_key
+
+if TYPE_CHECKING:
+    from mesqual.typevars import FlagType, DatasetConfigType
+    from studies.study_02_pypsa_eur_example.src.study_database import StudyDatabase
+
+
+def compute_delta(
+        variation: pd.DataFrame | pd.Series,
+        reference: pd.DataFrame | pd.Series,
+) -> pd.DataFrame | pd.Series:
+    """
+    variation - reference on the underlying NumPy arrays.
+
+    Frames with identical labels (the usual case for scenarios of the same study) are subtracted directly.
+    Otherwise both are reindexed once to the union of their labels, matching the alignment of pandas' `-`.
+    """
+    if isinstance(variation, pd.Series):
+        if not variation.index.equals(reference.index):
+            index = variation.index.union(reference.index)
+            variation, reference = variation.reindex(index), reference.reindex(index)
+        return pd.Series(variation.to_numpy() - reference.to_numpy(), index=variation.index, name=variation.name)
+
+    if not (variation.index.equals(reference.index) and variation.columns.equals(reference.columns)):
+        index = variation.index.union(reference.index)
+        columns = variation.columns.union(reference.columns)
+        variation = variation.reindex(index=index, columns=columns)
+        reference = reference.reindex(index=index, columns=columns)
+    return pd.DataFrame(variation.to_numpy() - reference.to_numpy(), index=variation.index, columns=variation.columns)
+
+
+def _is_numeric(value) -> bool:
+    if isinstance(value, pd.Series):
+        return pd.api.types.is_numeric_dtype(value)
+    if isinstance(value, pd.DataFrame):
+        return all(pd.api.types.is_numeric_dtype(dtype) for dtype in value.dtypes)
+    return False
+
+
+class ComparisonDeltaCache:
+    """
+    Incremental comparison deltas, cached by the fingerprints of both input scenarios.
+
+    A delta is only recomputed if the network file of its variation or reference scenario changed. When one
+    scenario out of many is re-solved, only the comparisons that involve it are rebuilt; all other deltas are
+    served from the study database, or from a small in-memory LRU for flags the database doesn't store.
+    Non-numeric flags (e.g. model flags) are computed by the comparison dataset itself.
+
+    The deltas are stored in the study database under the comparison dataset and the config of the scenarios,
+    so settings such as the precision policy are part of their keys.
+
+    Use enable_delta_cache to route the fetches of the comparison datasets through the cache.
+
+    Args:
+        database: The study database; provides the source fingerprints and persists the deltas.
+        config: Dataset config of the scenarios (e.g. a StudyDatasetConfig).
+        max_entries: Number of deltas kept in memory.
+
+    Examples:
+        >>> enable_delta_cache(study.comp, ComparisonDeltaCache(db, config))
+        >>> deltas = study.comp.fetch('countries_t.net_position')
+    """
+
+    def __init__(self, database: 'StudyDatabase', config: 'DatasetConfigType' = None, max_entries: int = 16):
+        self._db = database
+        self._config = config
+        self.max_entries = max_entries
+        self._deltas: OrderedDict[tuple, pd.DataFrame | pd.Series] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def fetch_delta(
+            self,
+            comparison,
+            flag: 'FlagType',
+            config: 'DatasetConfigType',
+            fallback: Callable[[], pd.DataFrame | pd.Series],
+            **kwargs
+    ) -> pd.DataFrame | pd.Series:
+        """
+        Delta of the comparison for the flag.
+
+        Args:
+            comparison: Comparison dataset with variation_dataset and reference_dataset.
+            flag: Flag to fetch.
+            config: Fetch config, passed on to the scenario fetches.
+            fallback: Computes the delta the regular way; used for non-numeric flags.
+            **kwargs: Fetch kwargs.
+        """
+        variation, reference = comparison.variation_dataset, comparison.reference_dataset
+        variation_fingerprint = self._db.get_source_fingerprint(variation)
+        reference_fingerprint = self._db.get_source_fingerprint(reference)
+        if variation_fingerprint is None or reference_fingerprint is None:
+            return self._compute(comparison, flag, config, fallback, **kwargs)
+
+        key_config = self._config if config is None else config
+        fingerprint_kwargs = dict(
+            _variation_fingerprint=variation_fingerprint,
+            _reference_fingerprint=reference_fingerprint,
+        )
+        key = (
+            comparison.name, flag, variation_fingerprint, reference_fingerprint,
+            config_key(key_config), repr(sorted(kwargs.items())),
+        )
+        with self._lock:
+            if key in self._deltas:
+                self.hits += 1
+                self._deltas.move_to_end(key)
+                return self._deltas[key]
+
+        is_stored = self._db.key_is_up_to_date(comparison, flag, key_config, **kwargs, **fingerprint_kwargs)
+        if is_stored:
+            delta = self._db.get(comparison, flag, key_config, **kwargs, **fingerprint_kwargs)
+        else:
+            delta = self._compute(comparison, flag, config, fallback, **kwargs)
+            if _is_numeric(delta):
+                self._db.set(comparison, flag, key_config, delta, **kwargs, **fingerprint_kwargs)
+
+        with self._lock:
+            if is_stored:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self._deltas[key] = delta
+            while len(self._deltas) > self.max_entries:
+                self._deltas.popitem(last=False)
+        return delta
+
+    @staticmethod
+    def _compute(
+            comparison,
+            flag: 'FlagType',
+            config: 'DatasetConfigType',
+            fallback: Callable[[], pd.DataFrame | pd.Series],
+            **kwargs
+    ) -> pd.DataFrame | pd.Series:
+        variation = comparison.variation_dataset.fetch(flag, config, **kwargs)
+        reference = comparison.reference_dataset.fetch(flag, config, **kwargs)
+        if not (_is_numeric(variation) and _is_numeric(reference)):
+            return fallback()
+        return compute_delta(variation, reference)
+
+
+class DeltaCachedComparisonMixin:
+    """Comparison dataset mixin that serves fetch from a ComparisonDeltaCache (see enable_delta_cache)."""
+    _delta_cache: ComparisonDeltaCache | None = None
+
+    def fetch(self, flag: 'FlagType', config: 'DatasetConfigType' = None, **kwargs):
+        if self._delta_cache is None:
+            return super().fetch(flag, config, **kwargs)
+        fallback = lambda: super(DeltaCachedComparisonMixin, self).fetch(flag, config, **kwargs)
+        return self._delta_cache.fetch_delta(self, flag, config, fallback, **kwargs)
+
+
+_DELTA_CACHED_CLASSES: dict[type, type] = dict()
+
+
+def enable_delta_cache(comparison_collection, delta_cache: ComparisonDeltaCache) -> None:
+    """
+    Routes the fetches of all comparison datasets of the collection (e.g. study.comp) through the delta cache.
+
+    mesqual creates the comparison datasets inside the StudyManager, so they are switched to a subclass of their
+    own class with the DeltaCachedComparisonMixin. study.comp.fetch, study.scen_comp.fetch and comparison KPIs
+    then all use the cache, while the public interface of the datasets stays the same.
+    """
+    datasets = comparison_collection.datasets
+    datasets = datasets.values() if isinstance(datasets, dict) else datasets
+    for comparison in datasets:
+        comparison_class = type(comparison)
+        if not issubclass(comparison_class, DeltaCachedComparisonMixin):
+            if comparison_class not in _DELTA_CACHED_CLASSES:
+                _DELTA_CACHED_CLASSES[comparison_class] = type(
+                    f'DeltaCached{comparison_class.__name__}',
+                    (DeltaCachedComparisonMixin, comparison_class),
+                    dict(),
+                )
+            comparison.__class__ = _DELTA_CACHED_CLASSES[comparison_class]
+        comparison._delta_cache = delta_cache
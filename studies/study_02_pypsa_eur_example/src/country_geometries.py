@@ -0,0 +1,93 @@
+import os
+import threading
+from pathlib import Path
+from typing import Iterable
+
+import geopandas as gpd
+from shapely import Point
+from shapely.geometry.base import BaseGeometry
+
+
+_PATH_TO_GEOPARQUET = Path('studies/study_02_pypsa_eur_example/dvc/country_geometries.parquet')
+
+
+def get_largest_polygon_rep_point(geom: BaseGeometry) -> Point:
+    """Get representative point of the largest polygon in a geometry."""
+    if geom.geom_type == 'MultiPolygon':
+        largest = max(geom.geoms, key=lambda p: p.area)
+    else:
+        largest = geom
+    return largest.representative_point()
+
+
+class CountryGeometryStore:
+    """
+    Process-wide store of country geometries and their projection points, keyed by country code.
+
+    On first use, all previously stored countries are loaded with one bulk GeoParquet read into an in-memory dict.
+    Countries that are not stored yet are looked up once via MapCountryPlotter and appended to the GeoParquet file,
+    so later processes find them on disk as well.
+
+    Args:
+        file_path: GeoParquet file that persists the store.
+    """
+
+    def __init__(self, file_path: str | Path = _PATH_TO_GEOPARQUET):
+        self._file_path = Path(file_path)
+        self._entries: dict[str, tuple[BaseGeometry, Point]] = None
+        self._lock = threading.Lock()
+        self._country_plotter = None
+
+    def get(self, countries: Iterable[str]) -> gpd.GeoDataFrame:
+        """GeoDataFrame with geometry and projection_point for the given countries (index 'Country')."""
+        countries = list(countries)
+        with self._lock:
+            entries = self._get_entries()
+            missing = [c for c in countries if c not in entries]
+            if missing:
+                for country in missing:
+                    geometry = self._get_country_plotter().get_geojson_for_country(country).geometry.iloc[0]
+                    entries[country] = (geometry, get_largest_polygon_rep_point(geometry))
+                self._persist(entries)
+            rows = [entries[c] for c in countries]
+
+        return _to_frame(countries, rows)
+
+    def _get_entries(self) -> dict[str, tuple[BaseGeometry, Point]]:
+        if self._entries is None:
+            self._entries = dict()
+            if self._file_path.exists():
+                stored = gpd.read_parquet(self._file_path)
+                self._entries = dict(zip(stored.index, zip(stored.geometry, stored['projection_point'])))
+        return self._entries
+
+    def _persist(self, entries: dict[str, tuple[BaseGeometry, Point]]) -> None:
+        gdf = _to_frame(list(entries), list(entries.values()))
+        try:
+            self._file_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._file_path.with_suffix('.parquet.tmp')
+            gdf.to_parquet(tmp_path)
+            os.replace(tmp_path, self._file_path)
+        except (OSError, ImportError):
+            pass  # persisting is only an optimization, the in-memory store is still filled
+
+    def _get_country_plotter(self):
+        if self._country_plotter is None:
+            from mesqual.utils.folium_utils import MapCountryPlotter
+            self._country_plotter = MapCountryPlotter()
+        return self._country_plotter
+
+
+def _to_frame(countries: list[str], rows: list[tuple[BaseGeometry, Point]]) -> gpd.GeoDataFrame:
+    gdf = gpd.GeoDataFrame(
+        {
+            'geometry': gpd.GeoSeries([r[0] for r in rows], index=countries, crs='EPSG:4326'),
+            'projection_point': gpd.GeoSeries([r[1] for r in rows], index=countries, crs='EPSG:4326'),
+        },
+        geometry='geometry',
+        crs='EPSG:4326',
+    )
+    return gdf.rename_axis('Country')
+
+
+COUNTRY_GEOMETRIES = CountryGeometryStore()
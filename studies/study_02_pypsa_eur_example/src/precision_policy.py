@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+from mesqual_pypsa import PyPSADatasetConfig
+
+
+class PrecisionPolicy:
+    """
+    Opt-in, memory-lean representation of the time series returned by the study interpreters.
+
+    Applied to the output of the interpreters (see apply_precision_policy), so the reduced representation is
+    what ends up in memory and in the study database. The policy is set in the dataset config
+    (StudyDatasetConfig) and thereby part of the database cache keys, hence results with different policies
+    (or without policy) never share cache entries.
+
+    Args:
+        float_dtype: dtype that float64 value columns are cast to.
+        categorical_columns: Store the column labels (each level of MultiIndex columns) as categoricals.
+
+    Examples:
+        >>> dataset = PyPSADataset(n, name='base', config=StudyDatasetConfig(precision_policy=PrecisionPolicy()))
+        >>> dataset.fetch('countries_t.net_position').dtypes.unique()
+        array([dtype('float32')], dtype=object)
+    """
+
+    def __init__(self, float_dtype: str | type = np.float32, categorical_columns: bool = True):
+        self.float_dtype = np.dtype(float_dtype)
+        self.categorical_columns = categorical_columns
+
+    @property
+    def key(self) -> str:
+        """Identifier of the policy for cache keys."""
+        return f'{self.float_dtype.name}-{"cat" if self.categorical_columns else "plain"}'
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, PrecisionPolicy) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        return f'PrecisionPolicy({self.key})'
+
+    def apply(self, value: pd.DataFrame | pd.Series) -> pd.DataFrame | pd.Series:
+        if isinstance(value, pd.Series):
+            if value.dtype == np.float64:
+                return value.astype(self.float_dtype)
+            return value
+        if not isinstance(value, pd.DataFrame):
+            return value
+
+        float_columns = value.dtypes == np.float64
+        if float_columns.all():
+            value = value.astype(self.float_dtype)
+        elif float_columns.any():
+            value = value.astype({c: self.float_dtype for c in value.columns[float_columns.to_numpy()]})
+
+        if self.categorical_columns:
+            value = value.copy(deep=False)
+            value.columns = _to_categorical_columns(value.columns)
+        return value
+
+
+def _to_categorical_columns(columns: pd.Index) -> pd.Index:
+    if isinstance(columns, pd.MultiIndex):
+        return columns.set_levels([pd.CategoricalIndex(level) for level in columns.levels])
+    if isinstance(columns, pd.CategoricalIndex):
+        return columns
+    return pd.CategoricalIndex(columns, name=columns.name)
+
+
+class StudyDatasetConfig(PyPSADatasetConfig):
+    """
+    PyPSADatasetConfig with the settings of the study interpreters.
+
+    Being part of the config, the settings are part of every database cache key of the dataset.
+
+    Args:
+        precision_policy: Optional PrecisionPolicy for the time series returned by the study interpreters.
+        **kwargs: Passed on to PyPSADatasetConfig.
+    """
+
+    def __init__(self, precision_policy: PrecisionPolicy = None, **kwargs):
+        super().__init__(**kwargs)
+        self.precision_policy = precision_policy
+
+
+def get_precision_policy(config) -> PrecisionPolicy | None:
+    """The precision policy of a (effective) dataset config, or None."""
+    return getattr(config, 'precision_policy', None)
+
+
+def apply_precision_policy(config, value: pd.DataFrame | pd.Series) -> pd.DataFrame | pd.Series:
+    """Returns value in the representation of the config's precision policy, or unchanged if it has none."""
+    policy = get_precision_policy(config)
+    if policy is None:
+        return value
+    return policy.apply(value)
@@ -0,0 +1,73 @@
+from typing import TYPE_CHECKING, Any, Iterator
+
+import pandas as pd
+
+if TYPE_CHECKING:
+    from mesqual_pypsa import PyPSADataset
+
+SnapshotWindow = tuple[pd.Timestamp | None, pd.Timestamp | None]
+
+
+def normalize_snapshot_window(snapshot_window: slice | tuple | None) -> SnapshotWindow | None:
+    """
+    Turns a snapshot window given as slice('2013-12-24', None) or ('2013-12-24', '2013-12-31') into a
+    hashable (start, stop) tuple of Timestamps. Both bounds are inclusive, like label-based .loc slicing.
+    """
+    if snapshot_window is None:
+        return None
+    if isinstance(snapshot_window, slice):
+        start, stop = snapshot_window.start, snapshot_window.stop
+    else:
+        start, stop = snapshot_window
+    return (
+        pd.Timestamp(start) if start is not None else None,
+        pd.Timestamp(stop) if stop is not None else None,
+    )
+
+
+def snapshot_window_kwargs(snapshot_window: SnapshotWindow | None) -> dict[str, Any]:
+    """Fetch kwargs that pass the window on to dependent flags. Empty for the full horizon, so cache keys are unchanged."""
+    if snapshot_window is None:
+        return dict()
+    return dict(snapshot_window=snapshot_window)
+
+
+def slice_snapshots(df: pd.DataFrame | pd.Series, snapshot_window: SnapshotWindow | None) -> pd.DataFrame | pd.Series:
+    if snapshot_window is None:
+        return df
+    start, stop = snapshot_window
+    return df.loc[start:stop]
+
+
+def iter_snapshot_chunks(
+        dataset: 'PyPSADataset',
+        flag: str,
+        chunk_size: int,
+        snapshot_window: slice | tuple | None = None,
+        **kwargs,
+) -> Iterator[pd.DataFrame | pd.Series]:
+    """
+    Fetches a time-series flag of the study interpreters in consecutive snapshot chunks.
+
+    Only one chunk is materialized at a time, so long horizons can be processed without holding the full
+    time series of all scenarios in memory.
+
+    Args:
+        dataset: Dataset to fetch from.
+        flag: A time-series flag that supports the snapshot_window kwarg, e.g. 'countries_t.net_position'.
+        chunk_size: Number of snapshots per chunk.
+        snapshot_window: Optional window to restrict the chunked range to.
+        **kwargs: Further fetch kwargs.
+
+    Examples:
+        >>> net_pos_max = pd.concat(
+        ...     chunk.max() for chunk in iter_snapshot_chunks(ds, 'countries_t.net_position', chunk_size=24 * 7)
+        ... ).groupby(level=0).max()
+    """
+    snapshots = dataset.n.snapshots
+    snapshot_window = normalize_snapshot_window(snapshot_window)
+    if snapshot_window is not None:
+        snapshots = snapshots[snapshots.slice_indexer(*snapshot_window)]
+    for start in range(0, len(snapshots), chunk_size):
+        stop = min(start + chunk_size, len(snapshots)) - 1
+        yield dataset.fetch(flag, snapshot_window=(snapshots[start], snapshots[stop]), **kwargs)
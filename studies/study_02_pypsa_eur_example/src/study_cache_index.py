@@ -0,0 +1,311 @@
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import weakref
+import argparse
+import threading
+from pathlib import Path
+from typing import Iterable
+
+DEFAULT_MANAGED_SUBFOLDERS = ('parquet', 'pickle')
+
+
+class CacheIndex:
+    """
+    Tracks size and last access time of the cache entries in a folder and evicts the least recently used ones.
+
+    Files inside the managed subfolders are tracked and can be evicted. With track_legacy, all other files of the
+    folder (e.g. entries of a PickleDatabase from earlier sessions) are tracked as legacy entries as well, so
+    they count against the budget and are evicted like any other entry; remove_legacy() deletes them at once.
+    Accesses are recorded with touch(). Entries that are about to be read can be pinned (see pin()), pinned
+    entries are never evicted. The index is persisted as JSON next to the cached files: periodically, when the
+    index is garbage collected and at interpreter exit, so access times survive across sessions.
+
+    Args:
+        folder_path: Cache folder.
+        max_bytes: Optional byte budget. enforce_budget() evicts least recently used files until the entries fit.
+        managed_subfolders: Subfolders of folder_path whose files are tracked (searched recursively).
+        track_legacy: Also track the files outside the managed subfolders.
+    """
+    INDEX_FILE_NAME = '_cache_index.json'
+    _FLUSH_INTERVAL_SECONDS = 30
+
+    def __init__(
+            self,
+            folder_path: str | Path,
+            max_bytes: int = None,
+            managed_subfolders: Iterable[str] = DEFAULT_MANAGED_SUBFOLDERS,
+            track_legacy: bool = True,
+    ):
+        self._folder = Path(folder_path)
+        self._index_path = self._folder.joinpath(self.INDEX_FILE_NAME)
+        self._managed_folders = [self._folder.joinpath(subfolder) for subfolder in managed_subfolders]
+        self.max_bytes = max_bytes
+        self.track_legacy = track_legacy
+        self._pinned: dict[str, int] = dict()
+        self._entries: dict[str, dict[str, float]] = self._load()
+        self._lock = threading.RLock()
+        self._last_flush = time.monotonic()
+        self._dirty = False
+        atexit.register(_flush_at_exit, weakref.ref(self))
+
+    def __del__(self):
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            return int(sum(e['size'] for e in self._entries.values()))
+
+    @property
+    def num_files(self) -> int:
+        return len(self._entries)
+
+    def touch(self, path: str | Path) -> None:
+        """Record an access of (or a write to) the given file. Files outside the managed subfolders are ignored."""
+        path = Path(path)
+        if not path.exists() or not self._is_managed(path):
+            return
+        with self._lock:
+            self._entries[self._key(path)] = dict(size=path.stat().st_size, last_access=time.time())
+            self._dirty = True
+        self._flush_if_due()
+
+    def pin(self, path: str | Path) -> bool:
+        """
+        Protects an existing file from eviction until unpin() is called, e.g. between a cache check and the read.
+
+        Returns:
+            False if the file does not exist (anymore); it is not pinned then.
+        """
+        path = Path(path)
+        with self._lock:
+            if not path.exists():
+                return False
+            key = self._key(path)
+            self._pinned[key] = self._pinned.get(key, 0) + 1
+            return True
+
+    def unpin(self, path: str | Path) -> None:
+        with self._lock:
+            key = self._key(Path(path))
+            count = self._pinned.get(key, 0) - 1
+            if count > 0:
+                self._pinned[key] = count
+            else:
+                self._pinned.pop(key, None)
+
+    def sync(self) -> None:
+        """
+        Rescans the tracked files: adds files that are missing in the index (e.g. if the index file was lost or for
+        legacy entries)
+        and drops entries whose file no longer exists. Needed once per session; touch() keeps the index up to date.
+        """
+        with self._lock:
+            on_disk = {self._key(p): p for p in self._iter_tracked_files()}
+            for key in set(self._entries) - set(on_disk):
+                del self._entries[key]
+            for key, path in on_disk.items():
+                stat = path.stat()
+                if key not in self._entries:
+                    self._entries[key] = dict(size=stat.st_size, last_access=stat.st_mtime)
+                else:
+                    self._entries[key]['size'] = stat.st_size
+            self._dirty = True
+
+    def enforce_budget(self) -> list[Path]:
+        """Evict least recently used files until the folder fits into max_bytes."""
+        if self.max_bytes is None:
+            return []
+        return self.prune(self.max_bytes)
+
+    def prune(self, max_bytes: int) -> list[Path]:
+        """Evict least recently used files until the tracked size is at most max_bytes.
+
+        Returns:
+            Paths of the removed files.
+        """
+        removed = []
+        with self._lock:
+            total = self.total_bytes
+            if total <= max_bytes:
+                return removed
+            for key, entry in sorted(self._entries.items(), key=lambda item: item[1]['last_access']):
+                if total <= max_bytes:
+                    break
+                if key in self._pinned:
+                    continue
+                removed.append(self._remove(key))
+                total -= entry['size']
+        self._flush_if_due()
+        return removed
+
+    def legacy_files(self) -> list[Path]:
+        """Tracked files outside the managed subfolders."""
+        with self._lock:
+            return [self._folder.joinpath(key) for key in self._entries if self._is_legacy(self._folder.joinpath(key))]
+
+    def remove_legacy(self) -> list[Path]:
+        """Deletes all legacy files, except pinned ones.
+
+        Returns:
+            Paths of the removed files.
+        """
+        with self._lock:
+            removed = [
+                self._remove(key) for key in list(self._entries)
+                if key not in self._pinned and self._is_legacy(self._folder.joinpath(key))
+            ]
+        self.flush()
+        return removed
+
+    def _remove(self, key: str) -> Path:
+        path = self._folder.joinpath(key)
+        path.unlink(missing_ok=True)
+        del self._entries[key]
+        self._dirty = True
+        return path
+
+    def summary(self) -> dict[str, int | float]:
+        with self._lock:
+            accesses = [e['last_access'] for e in self._entries.values()]
+            return dict(
+                num_files=self.num_files,
+                total_bytes=self.total_bytes,
+                max_bytes=self.max_bytes,
+                oldest_access=min(accesses) if accesses else None,
+                newest_access=max(accesses) if accesses else None,
+            )
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self._index_path.with_suffix('.json.tmp')
+            tmp_path.write_text(json.dumps(self._entries))
+            os.replace(tmp_path, self._index_path)
+            self._dirty = False
+            self._last_flush = time.monotonic()
+
+    def _flush_if_due(self) -> None:
+        if time.monotonic() - self._last_flush > self._FLUSH_INTERVAL_SECONDS:
+            self.flush()
+
+    def _is_managed(self, path: Path) -> bool:
+        return any(path.is_relative_to(folder) for folder in self._managed_folders)
+
+    def _is_legacy(self, path: Path) -> bool:
+        return not self._is_managed(path)
+
+    def _iter_tracked_files(self) -> Iterable[Path]:
+        folders = [self._folder] if self.track_legacy else self._managed_folders
+        for folder in folders:
+            if not folder.exists():
+                continue
+            for path in folder.rglob('*'):
+                if not path.is_file() or path.name.endswith('.tmp'):
+                    continue
+                if path.parent == self._folder and path.name.startswith(self.INDEX_FILE_NAME):
+                    continue
+                yield path
+
+    def _key(self, path: Path) -> str:
+        return path.relative_to(self._folder).as_posix()
+
+    def _load(self) -> dict[str, dict[str, float]]:
+        if not self._index_path.exists():
+            return dict()
+        try:
+            return json.loads(self._index_path.read_text())
+        except json.JSONDecodeError:
+            return dict()
+
+
+def _flush_at_exit(index_ref: weakref.ref) -> None:
+    index = index_ref()
+    if index is not None:
+        index.flush()
+
+
+_SIZE_UNITS = {'': 1, 'B': 1, 'KB': 1e3, 'MB': 1e6, 'GB': 1e9, 'TB': 1e12}
+
+
+def parse_size(size: str | int) -> int:
+    """Parses sizes like 500MB, 20GB or 1048576 into a number of bytes."""
+    if isinstance(size, int):
+        return size
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMGT]?B?)\s*', str(size).upper())
+    if match is None:
+        raise ValueError(f'Cannot parse size {size!r}. Use e.g. 500MB or 20GB.')
+    value, unit = match.groups()
+    return int(float(value) * _SIZE_UNITS[unit])
+
+
+def _format_size(num_bytes: int | float) -> str:
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(num_bytes) < 1e3:
+            return f'{num_bytes:.1f} {unit}'
+        num_bytes /= 1e3
+    return f'{num_bytes:.1f} TB'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Inspect and prune the study database cache folder.')
+    parser.add_argument(
+        '--folder',
+        default='studies/study_02_pypsa_eur_example/dvc/networks/__pickleDB',
+        help='Cache folder of the study database.',
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('info', help='Show number of files and total size of the cache.')
+    prune_parser = subparsers.add_parser('prune', help='Evict least recently used files down to a byte budget.')
+    prune_parser.add_argument('max_size', help='Byte budget, e.g. 20GB or 500MB.')
+    prune_parser.add_argument('--dry-run', action='store_true', help='Only report how much would be removed.')
+    subparsers.add_parser(
+        'clear-legacy',
+        help='Delete the entries of the old PickleDatabase layout, which the study database no longer reads.',
+    )
+    args = parser.parse_args()
+
+    if not Path(args.folder).exists():
+        print(f'Cache folder not found: {args.folder}')
+        sys.exit(1)
+
+    index = CacheIndex(args.folder)
+    index.sync()
+
+    if args.command == 'info':
+        summary = index.summary()
+        print(f'Files:       {summary["num_files"]}')
+        print(f'Total size:  {_format_size(summary["total_bytes"])}')
+        if summary['oldest_access'] is not None:
+            print(f'Oldest used: {time.ctime(summary["oldest_access"])}')
+            print(f'Newest used: {time.ctime(summary["newest_access"])}')
+        index.flush()
+
+    elif args.command == 'prune':
+        max_bytes = parse_size(args.max_size)
+        if args.dry_run:
+            excess = max(index.total_bytes - max_bytes, 0)
+            print(f'Would free at least {_format_size(excess)} of {_format_size(index.total_bytes)}.')
+            index.flush()
+            return
+        before = index.total_bytes
+        removed = index.prune(max_bytes)
+        index.flush()
+        print(f'Removed {len(removed)} files, freed {_format_size(before - index.total_bytes)}.')
+
+    elif args.command == 'clear-legacy':
+        before = index.total_bytes
+        removed = index.remove_legacy()
+        print(f'Removed {len(removed)} legacy files, freed {_format_size(before - index.total_bytes)}.')
+
+
+if __name__ == '__main__':
+    main()
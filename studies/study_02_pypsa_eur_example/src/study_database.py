@@ -1,17 +1,605 @@
+import os
+import re
+import sys
+import json
+import pickle
+import inspect
+import hashlib
+import functools
+import threading
+from pathlib import Path
+from typing import Iterable
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
 from mesqual.typevars import DatasetType, FlagType, DatasetConfigType
 from mesqual.databases import PickleDatabase
 from mesqual_pypsa import PyPSADataset
 
+from vanilla.network_loading import LazyNetwork
+from studies.study_02_pypsa_eur_example.src.study_cache_index import CacheIndex, parse_size, DEFAULT_MANAGED_SUBFOLDERS
+from studies.study_02_pypsa_eur_example.src.precision_policy import get_precision_policy
+
+
+class ParquetDatabase(PickleDatabase):
+    """Stores plain pandas DataFrames and Series as Parquet files.
+
+    Columns are written as individual Parquet columns, so subsets can be read with get_columns
+    without decoding the whole frame, and files are read through a memory map. Values that cannot be
+    represented in Arrow (e.g. GeoDataFrames or object columns) are pickled into a 'pickle' subfolder,
+    using the same file names as the Parquet entries.
+
+    Entries of the PickleDatabase from earlier sessions stay readable: when a key is only found there, it is
+    served from there and converted on the fly.
+
+    All entries of the folder are tracked in a CacheIndex, and every read or write updates their access time.
+    With max_bytes set, the least recently used entries are evicted whenever a write pushes the tracked entries
+    over budget; this includes the files of the PickleDatabase layout. An entry found by key_is_up_to_date is
+    pinned until the following get of the same thread has read it, so concurrent writes can't evict it in between.
+
+    Args:
+        folder_path: Cache folder. Entries are written to the 'parquet' and 'pickle' subfolders.
+        max_bytes: Optional byte budget for the tracked entries, e.g. 20e9 or '20GB'.
+    """
+    _METADATA_KEY = b'mesqual'
+
+    def __init__(self, folder_path: str | Path, max_bytes: int | str = None):
+        super().__init__(folder_path)
+        self._parquet_folder, self._pickle_folder = [Path(folder_path).joinpath(f) for f in DEFAULT_MANAGED_SUBFOLDERS]
+        self._parquet_folder.mkdir(parents=True, exist_ok=True)
+        self._pickle_folder.mkdir(parents=True, exist_ok=True)
+        self.cache_index = CacheIndex(folder_path, parse_size(max_bytes) if max_bytes is not None else None)
+        self.cache_index.sync()
+        self.cache_index.enforce_budget()
+        self._read_pins = threading.local()
+
+    def get(
+            self,
+            dataset: DatasetType,
+            flag: FlagType,
+            config: DatasetConfigType,
+            **kwargs
+    ):
+        parquet_path = self._get_parquet_path(dataset, flag, config, **kwargs)
+        try:
+            if parquet_path.exists():
+                return self._read_parquet(parquet_path)
+            pickle_path = self._get_pickle_path(parquet_path)
+            if pickle_path.exists():
+                return self._read_pickle(pickle_path)
+        finally:
+            self._release_read_pin()
+        value = super().get(dataset, flag, config, **kwargs)
+        self._write(parquet_path, value)
+        self.cache_index.enforce_budget()
+        return value
+
+    def get_columns(
+            self,
+            dataset: DatasetType,
+            flag: FlagType,
+            config: DatasetConfigType,
+            columns: list,
+            **kwargs
+    ) -> pd.DataFrame:
+        """Read only the given columns of a cached DataFrame.
+
+        Args:
+            dataset: Dataset type identifier
+            flag: Processing flag or stage identifier
+            config: Configuration object containing processing parameters
+            columns: Column labels to read; tuples for MultiIndex columns
+            **kwargs: Additional keyword arguments for cache key generation
+        """
+        parquet_path = self._get_parquet_path(dataset, flag, config, **kwargs)
+        if not parquet_path.exists():
+            return self.get(dataset, flag, config, **kwargs)[columns]
+        try:
+            return self._read_parquet(parquet_path, columns=columns)
+        finally:
+            self._release_read_pin()
+
+    def set(
+            self,
+            dataset: DatasetType,
+            flag: FlagType,
+            config: DatasetConfigType,
+            value,
+            **kwargs
+    ):
+        """Store data as Parquet file, or as pickle file if it cannot be represented in Arrow.
+
+        Args:
+            dataset: Dataset type identifier
+            flag: Processing flag or stage identifier
+            config: Configuration object containing processing parameters
+            value: Data to store (pandas Series or DataFrame)
+            **kwargs: Additional keyword arguments for cache key generation
+        """
+        self._write(self._get_parquet_path(dataset, flag, config, **kwargs), value)
+        self.cache_index.enforce_budget()
+
+    def key_is_up_to_date(
+            self,
+            dataset: DatasetType,
+            flag: FlagType,
+            config: DatasetConfigType,
+            **kwargs
+    ):
+        parquet_path = self._get_parquet_path(dataset, flag, config, **kwargs)
+        if self._pin_for_read(parquet_path) or self._pin_for_read(self._get_pickle_path(parquet_path)):
+            return True
+        return super().key_is_up_to_date(dataset, flag, config, **kwargs)
+
+    def _pin_for_read(self, path: Path) -> bool:
+        """Pins the entry until the next get of this thread. Each thread holds at most one pin."""
+        self._release_read_pin()
+        if not self.cache_index.pin(path):
+            return False
+        self._read_pins.path = path
+        return True
+
+    def _release_read_pin(self) -> None:
+        path = getattr(self._read_pins, 'path', None)
+        if path is not None:
+            self._read_pins.path = None
+            self.cache_index.unpin(path)
+
+    def _get_parquet_path(self, dataset: DatasetType, flag: FlagType, config: DatasetConfigType, **kwargs) -> Path:
+        try:
+            key_payload = pickle.dumps((config, sorted(kwargs.items())))
+        except Exception:
+            key_payload = repr((config, sorted(kwargs.items()))).encode()
+        key_hash = hashlib.md5(key_payload).hexdigest()
+        file_name = re.sub(r'[^\w.\-]', '_', f'{dataset.name}__{flag}__{key_hash}')
+        return self._parquet_folder.joinpath(f'{file_name}.parquet')
+
+    def _get_pickle_path(self, parquet_path: Path) -> Path:
+        return self._pickle_folder.joinpath(parquet_path.with_suffix('.pkl').name)
+
+    def _write(self, parquet_path: Path, value) -> None:
+        if not self._write_parquet(parquet_path, value):
+            self._write_pickle(self._get_pickle_path(parquet_path), value)
+
+    def _write_pickle(self, path: Path, value) -> None:
+        tmp_path = path.with_suffix('.pkl.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        self.cache_index.touch(path)
+
+    def _read_pickle(self, path: Path):
+        self.cache_index.touch(path)
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def _write_parquet(self, path: Path, value) -> bool:
+        if type(value) not in (pd.DataFrame, pd.Series):
+            return False
+
+        is_series = isinstance(value, pd.Series)
+        df = value.to_frame() if is_series else value
+        metadata = dict(
+            is_series=is_series,
+            series_name=value.name if is_series else None,
+            index_freq=df.index.freqstr if isinstance(df.index, pd.DatetimeIndex) and df.index.freq else None,
+            column_names=list(df.columns.names),
+            column_labels=list(df.columns),
+            categorical_levels=_get_categorical_levels(df.columns),
+        )
+        try:
+            metadata_json = json.dumps(metadata, default=_to_json_scalar)
+            flat_df = df.copy(deep=False)
+            flat_df.columns = [f'c{i}' for i in range(df.shape[1])]
+            table = pa.Table.from_pandas(flat_df, preserve_index=True)
+        except (TypeError, ValueError, pa.ArrowException):
+            return False
+
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            self._METADATA_KEY: metadata_json.encode(),
+        })
+        tmp_path = path.with_suffix('.parquet.tmp')
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+        self.cache_index.touch(path)
+        return True
+
+    def _read_parquet(self, path: Path, columns: list = None) -> pd.DataFrame | pd.Series:
+        self.cache_index.touch(path)
+        metadata = json.loads(pq.read_schema(path, memory_map=True).metadata[self._METADATA_KEY])
+        labels = [tuple(c) if isinstance(c, list) else c for c in metadata['column_labels']]
+
+        if columns is not None:
+            positions = {label: i for i, label in enumerate(labels)}
+            flat_columns = [f'c{positions[c]}' for c in columns]
+            labels = list(columns)
+        else:
+            flat_columns = None
+
+        table = pq.read_table(path, columns=flat_columns, memory_map=True, use_pandas_metadata=True)
+        df = table.to_pandas()
+        if metadata.get('index_freq'):
+            df.index = pd.DatetimeIndex(df.index, freq=metadata['index_freq'])
+
+        if len(metadata['column_names']) > 1:
+            df.columns = pd.MultiIndex.from_tuples(labels, names=metadata['column_names'])
+            categorical_levels = metadata.get('categorical_levels', [])
+            if categorical_levels:
+                df.columns = df.columns.set_levels(
+                    [pd.CategoricalIndex(df.columns.levels[i]) for i in categorical_levels],
+                    level=categorical_levels,
+                )
+        else:
+            df.columns = pd.Index(labels, name=metadata['column_names'][0])
+            if metadata.get('categorical_levels'):
+                df.columns = pd.CategoricalIndex(df.columns, name=df.columns.name)
+
+        if metadata['is_series'] and columns is None:
+            series_name = metadata['series_name']
+            return df.iloc[:, 0].rename(tuple(series_name) if isinstance(series_name, list) else series_name)
+        return df
+
+
+def _get_categorical_levels(columns: pd.Index) -> list[int]:
+    if isinstance(columns, pd.MultiIndex):
+        return [i for i, level in enumerate(columns.levels) if isinstance(level, pd.CategoricalIndex)]
+    return [0] if isinstance(columns, pd.CategoricalIndex) else []
 
-class StudyDatabase(PickleDatabase):
+
+def _to_json_scalar(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+_CONTENT_HASHES: dict[tuple[str, int, int], str] = {}
+
+
+def get_file_fingerprint(file_path: str | Path, content_hash: bool = False) -> str:
+    """Cheap fingerprint of a file based on its size and modification time.
+
+    With content_hash=True, a SHA-256 of the file content is streamed in 1 MiB chunks instead. The hash is
+    memoized per (path, size, mtime), so each version of a file is only read once per process.
+    """
+    file_path = str(Path(file_path).resolve())
+    stat = os.stat(file_path)
+    if not content_hash:
+        return f'{stat.st_size}-{stat.st_mtime_ns}'
+
+    memo_key = (file_path, stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _CONTENT_HASHES:
+        sha = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                sha.update(chunk)
+        _CONTENT_HASHES[memo_key] = sha.hexdigest()
+    return _CONTENT_HASHES[memo_key]
+
+
+_NETWORK_INDEX_ATTRIBUTES = ('snapshots', 'snapshot_weightings', 'investment_periods', 'investment_period_weightings')
+
+
+@functools.cache
+def get_network_attribute_index() -> frozenset[str]:
+    """Names of all component tables (e.g. 'buses', 'buses_t') and network-level attributes of a pypsa.Network.
+
+    Built once per process from pypsa's component table (list names) and the attribute table of the
+    Network component.
+    """
+    import pypsa
+
+    components = pypsa.Network().components
+    components = components.values() if hasattr(components, 'values') else components
+    names = set(_NETWORK_INDEX_ATTRIBUTES)
+    for component in components:
+        names.update([component.list_name, f'{component.list_name}_t'])
+        if component.list_name == 'networks':
+            names.update(component.attrs.index)
+    return frozenset(names)
+
+
+_LOCAL_PACKAGES = ('vanilla', 'studies')
+
+
+def _get_local_module_dependencies(module_name: str) -> list[str]:
+    """The given module and all modules of this repository it imports from, directly or transitively."""
+    seen = set()
+    to_visit = [module_name]
+    while to_visit:
+        name = to_visit.pop()
+        module = sys.modules.get(name)
+        if name in seen or module is None:
+            continue
+        seen.add(name)
+        for value in vars(module).values():
+            dependency = value.__name__ if inspect.ismodule(value) else getattr(value, '__module__', None)
+            if isinstance(dependency, str) and dependency.split('.')[0] in _LOCAL_PACKAGES:
+                to_visit.append(dependency)
+    return sorted(seen)
+
+
+def _iter_code_objects(obj) -> Iterable:
+    """Code objects of a function, or of all methods (incl. properties and nested functions) of a class."""
+    if inspect.isclass(obj):
+        for value in vars(obj).values():
+            if isinstance(value, (staticmethod, classmethod)):
+                value = value.__func__
+            if isinstance(value, property):
+                for accessor in (value.fget, value.fset, value.fdel):
+                    if accessor is not None:
+                        yield from _iter_code_objects(accessor)
+            elif inspect.isfunction(value):
+                yield from _iter_code_objects(value)
+    elif inspect.isfunction(obj):
+        to_visit = [obj.__code__]
+        while to_visit:
+            code = to_visit.pop()
+            yield code
+            to_visit.extend(c for c in code.co_consts if inspect.iscode(c))
+
+
+def _is_local(module_name: str | None) -> bool:
+    return isinstance(module_name, str) and module_name.split('.')[0] in _LOCAL_PACKAGES
+
+
+def _get_used_local_code(interpreter_class: type) -> tuple[list, list[str]]:
+    """
+    The repository code the interpreter actually uses.
+
+    Returns:
+        The functions and classes of its own module that it references (directly or through each other),
+        incl. local base classes, and the names of the other repository modules it references, incl. their
+        transitive repository dependencies.
+    """
+    module_globals = vars(sys.modules[interpreter_class.__module__])
+    objects = {interpreter_class.__qualname__: interpreter_class}
+    to_visit = [interpreter_class]
+    to_visit.extend(base for base in interpreter_class.__mro__[1:] if _is_local(base.__module__))
+    modules = set()
+    while to_visit:
+        obj = to_visit.pop()
+        objects.setdefault(obj.__qualname__, obj)
+        if inspect.isclass(obj) and obj.__module__ != interpreter_class.__module__:
+            modules.add(obj.__module__)
+            continue
+        for code in _iter_code_objects(obj):
+            for name in code.co_names:
+                value = module_globals.get(name)
+                if value is None:
+                    continue
+                if inspect.ismodule(value):
+                    if _is_local(value.__name__):
+                        modules.add(value.__name__)
+                elif _is_local(getattr(value, '__module__', None)):
+                    if value.__module__ != interpreter_class.__module__:
+                        modules.add(value.__module__)
+                    elif (inspect.isfunction(value) or inspect.isclass(value)) and value.__qualname__ not in objects:
+                        objects[value.__qualname__] = value
+                        to_visit.append(value)
+    dependencies = set()
+    for module_name in modules:
+        dependencies.update(_get_local_module_dependencies(module_name))
+    return [objects[name] for name in sorted(objects)], sorted(dependencies)
+
+
+def get_interpreter_source_version(interpreter_class: type) -> str:
+    """
+    Hash of the interpreter's own source, of the helper functions / classes of its module that it uses, and of
+    the repository modules it uses (e.g. vanilla.area_aggregation). Edits to other interpreters or unrelated
+    code of the same module don't change it.
+    """
+    objects, module_names = _get_used_local_code(interpreter_class)
+    md5 = hashlib.md5()
+    for obj in objects:
+        md5.update(inspect.getsource(obj).encode())
+    for module_name in module_names:
+        try:
+            md5.update(inspect.getsource(sys.modules[module_name]).encode())
+        except OSError:  # e.g. empty __init__ modules
+            continue
+    return md5.hexdigest()[:12]
+
+
+def get_required_flags(interpreter_class: type) -> set[FlagType]:
+    """The flags the interpreter declares as dependencies of its accepted flags (via _required_flags_for_flag)."""
+    required = set()
+    for flag in interpreter_class.accepted_flags:
+        try:
+            # declarations only depend on class-level state, so the class stands in for an instance
+            required.update(interpreter_class._required_flags_for_flag(interpreter_class, flag))
+        except Exception:
+            continue
+    return required
+
+
+class StudyDatabase(ParquetDatabase):
+    """Caches only custom (computed) flags; flags that map to a PyPSA network attribute are never stored.
+
+    Whether a flag is custom is decided by looking up its first component in the process-wide index of
+    pypsa.Network component tables and attributes (see get_network_attribute_index). Verdicts are memoized
+    per flag, and classification_cache_info reports how many lookups were served from that memo.
+
+    Cache keys include a fingerprint of the dataset's source network file and the version of the interpreter
+    that computes the flag. Re-solving a network or changing an interpreter therefore invalidates the affected
+    entries automatically, while all other entries stay valid across sessions.
+
+    Args:
+        folder_path: Cache folder.
+        content_hash: Fingerprint source files by a SHA-256 of their content instead of size and mtime.
+        interpreter_classes: Interpreters whose version becomes part of the cache key of their flags.
+            See register_interpreter_versions.
+        max_bytes: Optional byte budget for the cache folder, e.g. '20GB'.
+    """
+    def __init__(
+            self,
+            folder_path: str | Path,
+            content_hash: bool = False,
+            interpreter_classes: Iterable[type] = (),
+            max_bytes: int | str = None,
+    ):
+        super().__init__(folder_path, max_bytes=max_bytes)
+        self._content_hash = content_hash
+        self._source_files: dict[str, Path] = {}
+        self._interpreter_classes: dict[FlagType, type] = {}
+        self._interpreter_versions: dict[FlagType, str] = {}
+        self._custom_flag_verdicts: dict[FlagType, bool] = {}
+        self._classification_hits = 0
+        self._classification_misses = 0
+        self.register_interpreter_versions(*interpreter_classes)
+
+    def register_source_file(self, dataset_name: str, file_path: str | Path) -> None:
+        """Declare the network file a dataset was loaded from.
+
+        Datasets built on a LazyNetwork are detected automatically and don't need to be registered.
+        """
+        self._source_files[dataset_name] = Path(file_path)
+
+    def register_interpreter_versions(self, *interpreter_classes: type) -> None:
+        """Make the version of each interpreter part of the cache key of the flags it accepts.
+
+        The version is the interpreter's `version` class attribute if defined. Otherwise it is a hash of the
+        code the interpreter uses (see get_interpreter_source_version), so an edit of the interpreter or of a
+        helper it uses, such as vanilla.area_aggregation, invalidates its cached results, while edits of
+        unrelated interpreters don't. The versions of the registered interpreters of the flags it depends on
+        (see get_required_flags) are part of the version, so changes propagate to dependent flags.
+
+        The interpreters must declare accepted_flags as a class attribute.
+        """
+        for interpreter_class in interpreter_classes:
+            accepted_flags = interpreter_class.accepted_flags
+            if isinstance(accepted_flags, property):
+                raise TypeError(
+                    f'{interpreter_class.__name__}.accepted_flags must be a class attribute to register its version.'
+                )
+            for flag in accepted_flags:
+                self._interpreter_classes[flag] = interpreter_class
+
+        versions = dict()
+        for flag, interpreter_class in self._interpreter_classes.items():
+            self._interpreter_versions[flag] = self._get_interpreter_version(interpreter_class, versions, set())
+
+    def _get_interpreter_version(self, interpreter_class: type, versions: dict[type, str], visiting: set[type]) -> str:
+        if interpreter_class in versions:
+            return versions[interpreter_class]
+        version = getattr(interpreter_class, 'version', None)
+        if version is not None:
+            versions[interpreter_class] = str(version)
+            return versions[interpreter_class]
+
+        visiting.add(interpreter_class)
+        md5 = hashlib.md5(get_interpreter_source_version(interpreter_class).encode())
+        for flag in sorted(get_required_flags(interpreter_class), key=str):
+            dependency = self._interpreter_classes.get(flag)
+            if dependency is None or dependency in visiting:
+                continue
+            md5.update(f'{flag}={self._get_interpreter_version(dependency, versions, visiting)}'.encode())
+        visiting.discard(interpreter_class)
+        versions[interpreter_class] = md5.hexdigest()[:12]
+        return versions[interpreter_class]
+
+    def migrate_legacy_entries(
+            self,
+            datasets: Iterable[DatasetType],
+            flags: Iterable[FlagType],
+            config: DatasetConfigType,
+            legacy_config: DatasetConfigType = None,
+            **kwargs
+    ) -> int:
+        """Copies entries of the old PickleDatabase layout to the current, versioned cache keys.
+
+        Legacy entries were written without source fingerprint and interpreter version, so the regular lookups
+        never match them. Only call this if the legacy entries are known to match the current networks and
+        interpreters; they are copied as they are. Afterwards the legacy files can be deleted with
+        CacheIndex.remove_legacy() or the clear-legacy command of study_cache_index.
+
+        Args:
+            datasets: Datasets whose entries are migrated.
+            flags: Flags to migrate.
+            config: Config of the current fetches, i.e. the datasets' effective config.
+            legacy_config: Config the legacy entries were written with. Defaults to config.
+            **kwargs: Fetch kwargs of the legacy entries.
+
+        Returns:
+            Number of migrated entries.
+        """
+        legacy_config = config if legacy_config is None else legacy_config
+        flags = list(flags)
+        num_migrated = 0
+        for dataset in datasets:
+            for flag in flags:
+                if not self._is_persisted(dataset, flag, kwargs):
+                    continue
+                if not PickleDatabase.key_is_up_to_date(self, dataset, flag, legacy_config, **kwargs):
+                    continue
+                if self.key_is_up_to_date(dataset, flag, config, **kwargs):
+                    self._release_read_pin()
+                    continue
+                value = PickleDatabase.get(self, dataset, flag, legacy_config, **kwargs)
+                self.set(dataset, flag, config, value, **kwargs)
+                num_migrated += 1
+        return num_migrated
+
+    def _get_source_file(self, dataset: DatasetType) -> Path | None:
+        if dataset.name in self._source_files:
+            return self._source_files[dataset.name]
+        network = getattr(dataset, 'n', None)
+        if isinstance(network, LazyNetwork):
+            return Path(network.file_path)
+        return None
+
+    def get_source_fingerprint(self, dataset: DatasetType) -> str | None:
+        """Fingerprint of the network file the dataset was loaded from, or None if the file is unknown."""
+        source_file = self._get_source_file(dataset)
+        if source_file is None or not source_file.exists():
+            return None
+        return get_file_fingerprint(source_file, self._content_hash)
+
+    def _with_version_kwargs(self, dataset: DatasetType, flag: FlagType, config: DatasetConfigType, kwargs: dict) -> dict:
+        versioned_kwargs = dict(kwargs)
+        source_fingerprint = self.get_source_fingerprint(dataset)
+        if source_fingerprint is not None:
+            versioned_kwargs['_source_fingerprint'] = source_fingerprint
+        if flag in self._interpreter_versions:
+            versioned_kwargs['_interpreter_version'] = self._interpreter_versions[flag]
+        # The config is part of the key anyway; the policy is added explicitly in case the config cannot be pickled.
+        precision_policy = get_precision_policy(config)
+        if precision_policy is not None:
+            versioned_kwargs['_precision_policy'] = precision_policy.key
+        return versioned_kwargs
+
+    @property
+    def classification_cache_info(self) -> dict[str, int]:
+        return dict(
+            hits=self._classification_hits,
+            misses=self._classification_misses,
+            size=len(self._custom_flag_verdicts),
+        )
 
     def _is_custom_flag(self, dataset: PyPSADataset, flag: str) -> bool:
+        verdict = self._custom_flag_verdicts.get(flag)
+        if verdict is not None:
+            self._classification_hits += 1
+            return verdict
+
+        self._classification_misses += 1
         first_component = flag.split('.')[0]
-        try:
-            _ = getattr(dataset.n, first_component)
+        verdict = first_component not in get_network_attribute_index()
+        self._custom_flag_verdicts[flag] = verdict
+        return verdict
+
+    def _is_persisted(self, dataset: DatasetType, flag: FlagType, kwargs: dict) -> bool:
+        """Only full-horizon fetches of custom flags are stored.
+
+        Windowed fetches (snapshot_window kwarg, e.g. from iter_snapshot_chunks) are cheap slices of the horizon.
+        Storing every window as its own entry would fill the database with entries that are rarely reused, so
+        they bypass the database.
+        """
+        if 'snapshot_window' in kwargs:
             return False
-        except:
-            return True
+        return self._is_custom_flag(dataset, flag)
 
     def set(
             self,
@@ -21,7 +609,7 @@ class StudyDatabase(PickleDatabase):
             value,
             **kwargs
     ):
-        """Store data as pickle file.
+        """Store data as Parquet (or pickle) file.
 
         Args:
             dataset: Dataset type identifier
@@ -30,10 +618,32 @@ class StudyDatabase(PickleDatabase):
             value: Data to store (pandas Series or DataFrame)
             **kwargs: Additional keyword arguments for cache key generation
         """
-        if not self._is_custom_flag(dataset, flag):
+        if not self._is_persisted(dataset, flag, kwargs):
             return None
+        kwargs = self._with_version_kwargs(dataset, flag, config, kwargs)
         return super().set(dataset, flag, config, value, **kwargs)
 
+    def get(
+            self,
+            dataset: DatasetType,
+            flag: FlagType,
+            config: DatasetConfigType,
+            **kwargs
+    ):
+        kwargs = self._with_version_kwargs(dataset, flag, config, kwargs)
+        return super().get(dataset, flag, config, **kwargs)
+
+    def get_columns(
+            self,
+            dataset: DatasetType,
+            flag: FlagType,
+            config: DatasetConfigType,
+            columns: list,
+            **kwargs
+    ) -> pd.DataFrame:
+        kwargs = self._with_version_kwargs(dataset, flag, config, kwargs)
+        return super().get_columns(dataset, flag, config, columns, **kwargs)
+
     def key_is_up_to_date(
             self,
             dataset: DatasetType,
@@ -41,6 +651,7 @@ class StudyDatabase(PickleDatabase):
             config: DatasetConfigType,
             **kwargs
     ):
-        if not self._is_custom_flag(dataset, flag):
+        if not self._is_persisted(dataset, flag, kwargs):
             return False
+        kwargs = self._with_version_kwargs(dataset, flag, config, kwargs)
         return super().key_is_up_to_date(dataset, flag, config, **kwargs)
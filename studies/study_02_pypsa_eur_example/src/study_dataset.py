@@ -1,5 +1,7 @@
 from mesqual_pypsa import PyPSADataset
 
+from vanilla.fetch_memo import MemoizedFetchMixin
+
 from studies.study_02_pypsa_eur_example.src.study_interpreters import (
     TransmissionModelInterpreter,
     CountriesModelInterpreter,
@@ -11,12 +13,21 @@ from studies.study_02_pypsa_eur_example.src.study_interpreters import (
     CountryBorderFlows,
 )
 
+STUDY_INTERPRETERS = [
+    TransmissionModelInterpreter,
+    CountriesModelInterpreter,
+    CountryBordersModelInterpreter,
+    BusLoads,
+    CountryVolWeightedPrice,
+    CountryNetPosition,
+    BranchesP,
+    CountryBorderFlows,
+]
+
+for interpreter in STUDY_INTERPRETERS:
+    PyPSADataset.register_interpreter(interpreter)
+
 
-PyPSADataset.register_interpreter(TransmissionModelInterpreter)
-PyPSADataset.register_interpreter(CountriesModelInterpreter)
-PyPSADataset.register_interpreter(CountryBordersModelInterpreter)
-PyPSADataset.register_interpreter(BusLoads)
-PyPSADataset.register_interpreter(CountryVolWeightedPrice)
-PyPSADataset.register_interpreter(CountryNetPosition)
-PyPSADataset.register_interpreter(BranchesP)
-PyPSADataset.register_interpreter(CountryBorderFlows)
+class StudyDataset(MemoizedFetchMixin, PyPSADataset):
+    """PyPSADataset of the study scenarios; supports scoped fetch memos (see vanilla.fetch_memo.memoized_fetch)."""
+    pass
@@ -1,30 +1,39 @@
 from __future__ import annotations
 
+import threading
+from collections import OrderedDict
 from typing import TYPE_CHECKING
+import numpy as np
 import pandas as pd
-import geopandas as gpd
 
 from mesqual.energy_data_handling import FlowType
 from mesqual.utils.pandas_utils import filter_by_model_query
-from mesqual.utils.pandas_utils.pend_props import prepend_model_prop_levels
-from mesqual.energy_data_handling.area_accounting import AreaPriceCalculator
 from mesqual.typevars import FlagType, DatasetConfigType
-from mesqual.utils.folium_utils import MapCountryPlotter
 from mesqual.energy_data_handling.area_accounting import AreaBorderModelGenerator, AreaBorderGeometryCalculator
 
 from mesqual_pypsa.network_interpreters.base import PyPSAInterpreter
 
+from vanilla.border_geometry import compute_border_geometries
+from vanilla.area_aggregation import SparseAreaAggregatorCache, ColumnGroupReducer
+from vanilla.fetch_memo import fetch_unless_in_flight
+from studies.study_02_pypsa_eur_example.src.topology_cache import TOPOLOGY_CACHE, get_topology_key
+from studies.study_02_pypsa_eur_example.src.country_geometries import COUNTRY_GEOMETRIES
+from studies.study_02_pypsa_eur_example.src.branch_flows import BranchFlowBlock, get_flow_context
+from studies.study_02_pypsa_eur_example.src.precision_policy import apply_precision_policy, get_precision_policy
+from studies.study_02_pypsa_eur_example.src.snapshot_windows import (
+    normalize_snapshot_window,
+    snapshot_window_kwargs,
+    slice_snapshots,
+)
+
 
 if TYPE_CHECKING:
     from mesqual_pypsa.pypsa_config import PyPSADatasetConfig
 
 
 class CountriesModelInterpreter(PyPSAInterpreter):
-    _country_plotter = MapCountryPlotter()
 
-    @property
-    def accepted_flags(self) -> set[FlagType]:
-        return {'countries'}
+    accepted_flags: set[FlagType] = {'countries'}
 
     def _required_flags_for_flag(self, flag: FlagType) -> set[FlagType]:
         return {'buses'}
@@ -35,27 +44,13 @@ class CountriesModelInterpreter(PyPSAInterpreter):
         filtered_buses = buses[buses['unit'] == 'MWh_el']
 
         countries = filtered_buses['country'].unique().tolist()
-        geometries = [self._country_plotter.get_geojson_for_country(c).geometry.iloc[0] for c in countries]
-        gdf = gpd.GeoDataFrame({'geometry': geometries}, index=countries, crs="EPSG:4326").rename_axis('Country')
-
-        def get_largest_polygon_rep_point(geom):
-            """Get representative point of the largest polygon in a geometry."""
-            if geom.geom_type == 'MultiPolygon':
-                largest = max(geom.geoms, key=lambda p: p.area)
-            else:
-                largest = geom
-            return largest.representative_point()
-
-        gdf['projection_point'] = gdf.geometry.apply(get_largest_polygon_rep_point)
-
-        return gdf
+        # Geometries and projection points are looked up once per country and shared across scenarios and sessions.
+        return COUNTRY_GEOMETRIES.get(countries)
 
 
 class TransmissionModelInterpreter(PyPSAInterpreter):
 
-    @property
-    def accepted_flags(self) -> set[FlagType]:
-        return {'branches'}
+    accepted_flags: set[FlagType] = {'branches'}
 
     def _required_flags_for_flag(self, flag: FlagType) -> set[FlagType]:
         return {'lines', 'links', 'transformers'}
@@ -74,167 +69,265 @@ class TransmissionModelInterpreter(PyPSAInterpreter):
 
 
 class CountryBordersModelInterpreter(PyPSAInterpreter):
-
-    @property
-    def accepted_flags(self) -> set[FlagType]:
-        return {'country_borders'}
+    """
+    Detects cross-border connections and computes border geometries.
+
+    Border geometries are computed with AreaBorderGeometryCalculator border by border. Set
+    `use_vectorized_geometry = True` to compute them for all borders at once with shapely 2 array operations
+    instead (see vanilla.border_geometry). That is much faster for large models, but it draws non-physical
+    borders as center-to-center lines and derives azimuth_angle from the areas' projection points, so the
+    map output differs from the calculator's.
+    """
+    use_vectorized_geometry = False
+    _area_column = 'country'
+    _source_area_identifier = '0'
+    _target_area_identifier = '1'
+
+    accepted_flags: set[FlagType] = {'country_borders'}
 
     def _required_flags_for_flag(self, flag: FlagType) -> set[FlagType]:
-        return {'country', 'branches'}
+        return {'buses', 'countries', 'branches'}
 
     def _fetch(self, flag: FlagType, effective_config: PyPSADatasetConfig, **kwargs) -> pd.Series | pd.DataFrame:
         node_model_df = self.parent_dataset.fetch('buses')
         branch_model_df = self.parent_dataset.fetch('branches')
         country_model_df = self.parent_dataset.fetch('countries')
+
+        # Scenarios with the same bus→country mapping, branch endpoints and country shapes share one border model.
+        topology_key = (
+            'country_borders',
+            get_topology_key(
+                node_model_df[self._area_column],
+                branch_model_df[['bus0', 'bus1']],
+                pd.Series(country_model_df.geometry.to_wkb(), index=country_model_df.index),
+            ),
+        )
+        country_border_model_df = TOPOLOGY_CACHE.get_or_compute(
+            topology_key,
+            lambda: self._compute_country_border_model(node_model_df, branch_model_df, country_model_df),
+        )
+        return country_border_model_df.copy(deep=False)
+
+    @classmethod
+    def _compute_country_border_model(
+            cls,
+            node_model_df: pd.DataFrame,
+            branch_model_df: pd.DataFrame,
+            country_model_df: pd.DataFrame,
+    ) -> pd.DataFrame:
         border_model_gen = AreaBorderModelGenerator(
             node_model_df,
             branch_model_df,
-            area_column='country',
+            area_column=cls._area_column,
             node_from_col='bus0',
             node_to_col='bus1',
             border_identifier='_border',
-            source_area_identifier='0',
-            target_area_identifier='1',
+            source_area_identifier=cls._source_area_identifier,
+            target_area_identifier=cls._target_area_identifier,
         )
-        border_geo_calc = AreaBorderGeometryCalculator(country_model_df)
         country_border_model_df = border_model_gen.generate_area_border_model()
-        country_border_model_df = border_model_gen.enhance_with_geometry(country_border_model_df, border_geo_calc)
-        return country_border_model_df
+
+        if not cls.use_vectorized_geometry:
+            border_geo_calc = AreaBorderGeometryCalculator(country_model_df)
+            return border_model_gen.enhance_with_geometry(country_border_model_df, border_geo_calc)
+
+        geometry_df = compute_border_geometries(
+            country_model_df,
+            country_border_model_df[cls._source_area_identifier],
+            country_border_model_df[cls._target_area_identifier],
+        )
+        return country_border_model_df.assign(**{c: geometry_df[c] for c in geometry_df.columns})
 
 
 class BusLoads(PyPSAInterpreter):
+    """Aggregates loads per bus. Supports the snapshot_window fetch kwarg."""
 
-    @property
-    def accepted_flags(self) -> set[FlagType]:
-        return {'buses_t.load_p'}
+    accepted_flags: set[FlagType] = {'buses_t.load_p'}
 
     def _required_flags_for_flag(self, flag: FlagType) -> set[FlagType]:
         return {'loads_t.p', 'loads'}
 
     def _fetch(self, flag: FlagType, effective_config: DatasetConfigType, **kwargs) -> pd.Series | pd.DataFrame:
+        snapshot_window = normalize_snapshot_window(kwargs.get('snapshot_window'))
         loads = self.parent_dataset.fetch('loads')
-        loads_t = self.parent_dataset.fetch('loads_t.p')
-        loads_t = prepend_model_prop_levels(loads_t, loads, 'bus')
-        return loads_t.T.groupby(level='bus').sum().T.rename_axis('Bus', axis=1)
+        loads_t = slice_snapshots(self.parent_dataset.fetch('loads_t.p'), snapshot_window)
+
+        # The load→bus grouping only depends on topology, so it is shared by all scenarios with the same loads.
+        topology_key = ('load_to_bus', get_topology_key(loads['bus'], loads_t.columns))
+        load_to_bus = TOPOLOGY_CACHE.get_or_compute(
+            topology_key,
+            lambda: ColumnGroupReducer(loads_t.columns, loads['bus']),
+        )
+        return apply_precision_policy(effective_config, load_to_bus.sum(loads_t).rename_axis('Bus', axis=1))
 
 
 class CountryVolWeightedPrice(PyPSAInterpreter):
-    """Calculates Demand Volume Weighted Price per country"""
-    @property
-    def accepted_flags(self) -> set[FlagType]:
-        return {'countries_t.vol_weighted_marginal_price'}
+    """Calculates Demand Volume Weighted Price per country. Supports the snapshot_window fetch kwarg."""
+
+    accepted_flags: set[FlagType] = {'countries_t.vol_weighted_marginal_price'}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._aggregators = SparseAreaAggregatorCache()
 
     def _required_flags_for_flag(self, flag: FlagType) -> set[FlagType]:
         return {'buses_t.marginal_price', 'buses_t.load_p', 'buses'}
 
     def _fetch(self, flag: FlagType, effective_config: DatasetConfigType, **kwargs) -> pd.Series | pd.DataFrame:
         parent_ds = self.parent_dataset
+        snapshot_window = normalize_snapshot_window(kwargs.get('snapshot_window'))
 
         bus_model_df = parent_ds.fetch('buses')
         electricity_buses = bus_model_df[bus_model_df['unit'] == 'MWh_el']
 
-        prices = parent_ds.fetch('buses_t.marginal_price')
-        loads = parent_ds.fetch('buses_t.load_p')
+        prices = slice_snapshots(parent_ds.fetch('buses_t.marginal_price'), snapshot_window)
+        loads = parent_ds.fetch('buses_t.load_p', **snapshot_window_kwargs(snapshot_window))
 
         my_buses = list(set(electricity_buses.index).intersection(prices.columns).intersection(loads.columns))
         prices = prices[my_buses]
         loads = loads[my_buses]
 
-        area_price_gen = AreaPriceCalculator(node_model_df=electricity_buses, area_column='country')
-        area_price = area_price_gen.calculate(node_price_df=prices, weighting_factor_df=loads)
-        return area_price.rename_axis('Country', axis=1)
+        bus_to_country = self._aggregators.get(electricity_buses['country'])
+        area_price = bus_to_country.weighted_mean(prices, loads, fallback_to_mean=True)
+        return apply_precision_policy(effective_config, area_price.rename_axis('Country', axis=1))
 
 
 class CountryNetPosition(PyPSAInterpreter):
-    """Calculates Net-Position and Trade-Balance per country"""
+    """
+    Calculates Net-Position and Trade-Balance per country
 
-    @property
-    def accepted_flags(self) -> set[FlagType]:
-        return {'countries_t.net_position', 'countries_t.trade_balance_per_partner'}
+    Both flags are derived from one trade balance computation. Fetching either flag also fetches the other one
+    from the same result, so the dataset's database is populated with both in a single call.
+    Supports the snapshot_window fetch kwarg.
+    """
+    _flag_trade_balance = 'countries_t.trade_balance_per_partner'
+    _flag_net_position = 'countries_t.net_position'
 
-    def _required_flags_for_flag(self, flag: FlagType) -> set[FlagType]:
-        return {'branches', 'branches_t.p0', 'branches_t.p1'}
+    accepted_flags: set[FlagType] = {_flag_net_position, _flag_trade_balance}
 
-    def _fetch(self, flag: FlagType, effective_config: DatasetConfigType, **kwargs) -> pd.Series | pd.DataFrame:
-        from mesqual.energy_data_handling import NetworkLineFlowsData, RegionalTradeBalanceCalculator
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Trade balance of the outermost call of each thread, reused by the sibling fetch of the same thread.
+        self._active = threading.local()
 
-        branch_model_df = self.parent_dataset.fetch('branches', effective_config)
-        bus_model_df = self.parent_dataset.fetch('buses', effective_config)
+    def _required_flags_for_flag(self, flag: FlagType) -> set[FlagType]:
+        return {'branches', 'buses', 'branches_t.p0', 'branches_t.p1'}
 
-        trade_bal_calc = RegionalTradeBalanceCalculator(
-            branch_model_df,
-            bus_model_df,
-            agg_region_column='country',
-            node_from_col='bus0',
-            node_to_col='bus1',
-        )
-        line_flow_data = NetworkLineFlowsData.from_nodal_net_injection(
-            node_a_net_injection=self.parent_dataset.fetch('branches_t.p0', effective_config),
-            node_b_net_injection=self.parent_dataset.fetch('branches_t.p1', effective_config),
-        )
-        trade_bal_df = trade_bal_calc.get_trade_balance(line_flow_data, flow_type=FlowType.PRE_LOSS)
+    def _fetch(self, flag: FlagType, effective_config: DatasetConfigType, **kwargs) -> pd.Series | pd.DataFrame:
+        snapshot_window = normalize_snapshot_window(kwargs.get('snapshot_window'))
+        flow_context = get_flow_context(self.parent_dataset, snapshot_window, effective_config)
+        # The outermost call computes the trade balance and keeps it only while the sibling flag is fetched.
+        previous = getattr(self._active, 'trade_balance', None)
+        is_outer_call = previous is None or previous[0] != snapshot_window
+        if is_outer_call:
+            self._active.trade_balance = (snapshot_window, self._compute_trade_balance(flow_context))
+        try:
+            trade_bal_df = self._active.trade_balance[1]
+            if 'trade_balance_per_partner' in flag:
+                sibling_flag = self._flag_net_position
+                result = trade_bal_df
+            elif 'net_position' in flag:
+                sibling_flag = self._flag_trade_balance
+                result = flow_context.trade_balance_calculator.get_net_position_per_primary_level(trade_bal_df)
+            else:
+                raise NotImplementedError(f'Flag {flag} logic not implemented in this class. check your logic.')
+
+            if is_outer_call:
+                # Fetching the sibling through the dataset stores it in the dataset's database. No lock is held
+                # here, and a sibling that another thread is already computing is skipped instead of awaited.
+                fetch_unless_in_flight(
+                    self.parent_dataset, sibling_flag, effective_config, **snapshot_window_kwargs(snapshot_window)
+                )
+            return apply_precision_policy(effective_config, result)
+        finally:
+            if is_outer_call:
+                self._active.trade_balance = previous
+
+    @staticmethod
+    def _compute_trade_balance(flow_context) -> pd.DataFrame:
+        trade_bal_calc = flow_context.trade_balance_calculator
+        trade_bal_df = trade_bal_calc.get_trade_balance(flow_context.line_flow_data, flow_type=FlowType.PRE_LOSS)
         trade_bal_df.columns.name = 'Country'
-
-        if 'trade_balance_per_partner' in flag:
-            return trade_bal_df
-
-        elif 'net_position' in flag:
-            net_position = trade_bal_calc.get_net_position_per_primary_level(trade_bal_df)
-            return net_position
-
-        raise NotImplementedError(f'Flag {flag} logic not implemented in this class. check your logic.')
+        return trade_bal_df
 
 
 class BranchesP(PyPSAInterpreter):
+    """
+    Merges the p0 / p1 flows of lines, links and transformers.
+
+    Both sides are built in one pass into a BranchFlowBlock, and both flags are served as views on it. The
+    block is only kept until both sides of it have been served, and each served side is released right away,
+    so at most the not yet served side stays referenced by the interpreter. If only one side of a block is ever
+    requested, the block is dropped once `max_pending_blocks` newer blocks (other snapshot windows or dtypes)
+    are pending.
+    Set `dtype = np.float32` to halve the memory of the block, and `memmap_folder` to back it by files.
+    With the snapshot_window fetch kwarg, only the window is copied into the block.
+    """
     _object_classes_to_merge = ['lines', 'links', 'transformers']
+    dtype = np.float64
+    memmap_folder: str = None
+    max_pending_blocks = 2
 
-    @property
-    def accepted_flags(self) -> set[FlagType]:
-        return {'branches_t.p0', 'branches_t.p1'}
+    accepted_flags: set[FlagType] = {'branches_t.p0', 'branches_t.p1'}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._pending_blocks: OrderedDict[tuple, BranchFlowBlock] = OrderedDict()
+        self._lock = threading.Lock()
 
     def _required_flags_for_flag(self, flag: FlagType) -> set[FlagType]:
         return {f'{f}_t.p{n}' for f in self._object_classes_to_merge for n in [0, 1]}
 
     def _fetch(self, flag: FlagType, effective_config: DatasetConfigType, **kwargs) -> pd.Series | pd.DataFrame:
-        which_power = str(flag)[-1]
-        branches_t_p = pd.concat(
-            [
-                self.parent_dataset.fetch(f'{f}_t.p{which_power}')
-                for f in self._object_classes_to_merge
-            ],
-            axis=1
-        ).rename_axis('Branch', axis=1)
-        return branches_t_p
+        side = 0 if str(flag).endswith('p0') else 1
+        snapshot_window = normalize_snapshot_window(kwargs.get('snapshot_window'))
+        return apply_precision_policy(effective_config, self._take_side(side, snapshot_window, effective_config))
+
+    def _take_side(self, side: int, snapshot_window, effective_config: DatasetConfigType) -> pd.DataFrame:
+        # A precision policy of the config overrides the dtype, so the block is not cast again afterwards.
+        precision_policy = get_precision_policy(effective_config)
+        dtype = self.dtype if precision_policy is None else precision_policy.float_dtype
+        key = (snapshot_window, np.dtype(dtype))
+        with self._lock:
+            flow_block = self._pending_blocks.get(key)
+            if flow_block is None or flow_block.is_released(side):
+                flow_block = self._build_flow_block(snapshot_window, dtype)
+            frame = flow_block.p0() if side == 0 else flow_block.p1()
+            flow_block.release(side)
+            if flow_block.is_released(1 - side):
+                self._pending_blocks.pop(key, None)
+            else:
+                self._pending_blocks[key] = flow_block
+                self._pending_blocks.move_to_end(key)
+                while len(self._pending_blocks) > self.max_pending_blocks:
+                    self._pending_blocks.popitem(last=False)
+        return frame
+
+    def _build_flow_block(self, snapshot_window, dtype) -> BranchFlowBlock:
+        sources = [
+            slice_snapshots(self.parent_dataset.fetch(f'{f}_t.p{n}'), snapshot_window)
+            for n in [0, 1]
+            for f in self._object_classes_to_merge
+        ]
+        num_classes = len(self._object_classes_to_merge)
+        return BranchFlowBlock(
+            p0_frames=sources[:num_classes],
+            p1_frames=sources[num_classes:],
+            dtype=dtype,
+            memmap_folder=self.memmap_folder,
+        )
 
 
 class CountryBorderFlows(PyPSAInterpreter):
+    """Net flow per country border. Supports the snapshot_window fetch kwarg."""
 
-    @property
-    def accepted_flags(self) -> set[FlagType]:
-        return {
-            'country_borders_t.net_flow',
-        }
+    accepted_flags: set[FlagType] = {'country_borders_t.net_flow'}
 
     def _required_flags_for_flag(self, flag: FlagType) -> set[FlagType]:
-        return {'branches', 'branches_t.p0', 'branches_t.p1'}
+        return {'country_borders', 'branches', 'buses', 'branches_t.p0', 'branches_t.p1'}
 
     def _fetch(self, flag: FlagType, effective_config: DatasetConfigType, **kwargs) -> pd.Series | pd.DataFrame:
-        from mesqual.energy_data_handling import NetworkLineFlowsData, BorderFlowCalculator
-
-        country_border_model_df = self.parent_dataset.fetch('country_borders')
-        branch_model_df = self.parent_dataset.fetch('branches')
-        bus_model_df = self.parent_dataset.fetch('buses')
-
-        flow_calc = BorderFlowCalculator(
-            country_border_model_df,
-            branch_model_df,
-            bus_model_df,
-            'country',
-            'bus0',
-            'bus1',
-        )
-        line_flow_data = NetworkLineFlowsData.from_nodal_net_injection(
-            node_a_net_injection=self.parent_dataset.fetch('branches_t.p0'),
-            node_b_net_injection=self.parent_dataset.fetch('branches_t.p1'),
-        )
-        return flow_calc.calculate(line_flow_data, 'sent', 'net')
+        snapshot_window = normalize_snapshot_window(kwargs.get('snapshot_window'))
+        flow_context = get_flow_context(self.parent_dataset, snapshot_window, effective_config)
+        net_flow = flow_context.border_flow_calculator.calculate(flow_context.line_flow_data, 'sent', 'net')
+        return apply_precision_policy(effective_config, net_flow)
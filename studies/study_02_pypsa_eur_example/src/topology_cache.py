@@ -0,0 +1,60 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, TypeVar
+
+import numpy as np
+import pandas as pd
+
+T = TypeVar('T')
+
+
+def get_topology_key(*objects: pd.Series | pd.DataFrame | pd.Index) -> str:
+    """Content hash of the given pandas objects (values and labels), e.g. the bus column of the loads model."""
+    sha = hashlib.sha1()
+    for obj in objects:
+        sha.update(pd.util.hash_pandas_object(obj).to_numpy(dtype=np.uint64).tobytes())
+        sha.update(b'|')
+    return sha.hexdigest()
+
+
+class TopologyCache:
+    """
+    Process-wide cache for values derived from network topology, shared by all datasets.
+
+    Scenarios that share a network topology produce the same topology key, so expensive derived structures
+    (grouping indices, border models, ...) are computed once for the first scenario and reused for all others.
+
+    Args:
+        max_entries: Maximum number of cached values; the least recently used ones are dropped first.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, object] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T]) -> T:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+TOPOLOGY_CACHE = TopologyCache()
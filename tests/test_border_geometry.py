@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import pytest
+import shapely
+
+from vanilla.border_geometry import compute_border_geometries
+
+
+@pytest.fixture
+def area_gdf():
+    return gpd.GeoDataFrame(
+        geometry=[
+            shapely.box(0, 0, 1, 1),  # A
+            shapely.box(1, 0, 2, 1),  # B: shares an edge with A
+            shapely.box(3, 3, 4, 4),  # C: touches nothing
+            shapely.box(0, 1, 1, 2),  # D: shares an edge with A, touches B in the corner (1, 1)
+        ],
+        index=pd.Index(['A', 'B', 'C', 'D'], name='country'),
+        crs=4326,
+    )
+
+
+def _bearing(point_from, point_to) -> float:
+    return np.degrees(np.arctan2(point_to.x - point_from.x, point_to.y - point_from.y)) % 360
+
+
+def _angle_difference(a, b):
+    return np.abs((np.asarray(a) - np.asarray(b) + 180) % 360 - 180)
+
+
+def test_borders_touching_in_a_point_only(area_gdf):
+    """A corner-only contact before another physical border must not break the vectorized line extraction."""
+    borders = pd.Index(['A - B', 'A - C', 'B - D', 'A - D'])
+    result = compute_border_geometries(
+        area_gdf,
+        pd.Series(['A', 'A', 'B', 'A'], index=borders),
+        pd.Series(['B', 'C', 'D', 'D'], index=borders),
+    )
+
+    assert result['is_physical'].to_list() == [True, False, True, True]
+    assert result.loc['A - B', 'geo_line_string'].equals(shapely.LineString([(1, 0), (1, 1)]))
+    assert result.loc['A - D', 'geo_line_string'].equals(shapely.LineString([(0, 1), (1, 1)]))
+
+    # no shared line: falls back to the straight line between the representative points
+    b_point, d_point = shapely.point_on_surface(area_gdf.geometry[['B', 'D']].to_numpy())
+    assert result.loc['B - D', 'geo_line_string'].equals(shapely.LineString([b_point, d_point]))
+    assert result.loc['B - D', 'azimuth_angle'] == pytest.approx(_bearing(b_point, d_point))
+
+
+def test_azimuth_is_the_bearing_between_projection_points(area_gdf):
+    borders = pd.Index(['A - B', 'A - C', 'B - D', 'D - A'])
+    area_from = pd.Series(['A', 'A', 'B', 'D'], index=borders)
+    area_to = pd.Series(['B', 'C', 'D', 'A'], index=borders)
+    result = compute_border_geometries(area_gdf, area_from, area_to)
+
+    points = pd.Series(shapely.point_on_surface(area_gdf.geometry.to_numpy()), index=area_gdf.index)
+    expected = [_bearing(points[a], points[b]) for a, b in zip(area_from, area_to)]
+    np.testing.assert_allclose(result['azimuth_angle'].to_numpy(), expected, atol=1e-9)
+    assert _angle_difference(result.loc['A - B', 'azimuth_angle'], 90) < 5
+    assert _angle_difference(result.loc['D - A', 'azimuth_angle'], 180) < 5
+
+
+def test_without_any_shared_line(area_gdf):
+    borders = pd.Index(['B - D', 'A - C'])
+    result = compute_border_geometries(
+        area_gdf,
+        pd.Series(['B', 'A'], index=borders),
+        pd.Series(['D', 'C'], index=borders),
+    )
+    assert result['is_physical'].to_list() == [True, False]
+    assert shapely.get_type_id(result['geo_line_string'].to_numpy()).tolist() == [1, 1]
+
+
+def test_matches_area_border_geometry_calculator(area_gdf):
+    area_accounting = pytest.importorskip('mesqual.energy_data_handling.area_accounting')
+
+    node_model_df = pd.DataFrame(
+        {'country': ['A', 'B', 'C', 'D']},
+        index=pd.Index(['a1', 'b1', 'c1', 'd1'], name='Bus'),
+    )
+    branch_model_df = pd.DataFrame(
+        {'bus0': ['a1', 'a1', 'b1', 'd1'], 'bus1': ['b1', 'c1', 'd1', 'a1']},
+        index=pd.Index(['l1', 'l2', 'l3', 'l4'], name='Branch'),
+    )
+    border_model_gen = area_accounting.AreaBorderModelGenerator(
+        node_model_df,
+        branch_model_df,
+        area_column='country',
+        node_from_col='bus0',
+        node_to_col='bus1',
+        border_identifier='_border',
+        source_area_identifier='0',
+        target_area_identifier='1',
+    )
+    border_model_df = border_model_gen.generate_area_border_model()
+    expected = border_model_gen.enhance_with_geometry(
+        border_model_df,
+        area_accounting.AreaBorderGeometryCalculator(area_gdf),
+    )
+    result = compute_border_geometries(area_gdf, border_model_df['0'], border_model_df['1'])
+
+    pd.testing.assert_series_equal(
+        result['is_physical'].astype(bool),
+        expected['is_physical'].astype(bool).reindex(result.index),
+    )
+
+    boundaries = area_gdf.boundary
+    for border, (area_from, area_to) in border_model_df[['0', '1']].iterrows():
+        if shapely.intersection(boundaries[area_from], boundaries[area_to]).length == 0:
+            continue  # only physical borders with a shared line are expected to match
+        line, expected_line = result.loc[border, 'geo_line_string'], expected.loc[border, 'geo_line_string']
+        assert shapely.hausdorff_distance(line, expected_line) == pytest.approx(0, abs=1e-9), border
+
+    # azimuth_angle is defined differently (see compute_border_geometries), only its orientation is shared
+    assert (_angle_difference(result['azimuth_angle'], expected['azimuth_angle'].reindex(result.index)) < 90).all()
@@ -0,0 +1,59 @@
+import threading
+
+from vanilla.fetch_memo import MemoizedFetchMixin, fetch_unless_in_flight, memoized_fetch
+
+
+class _SiblingDataset:
+    """Computes flags 'a' and 'b' in one pass and fetches the other one as sibling, like CountryNetPosition."""
+    name = 'base'
+
+    def __init__(self, barrier: threading.Barrier):
+        self._barrier = barrier
+        self._active = threading.local()
+        self.computations = []
+
+    def fetch(self, flag, config=None, **kwargs):
+        is_outer_call = not getattr(self._active, 'flag', None)
+        self.computations.append(flag)
+        if is_outer_call:
+            self._active.flag = flag
+            try:
+                self._barrier.wait(timeout=5)  # both threads own their flag before fetching the sibling
+                fetch_unless_in_flight(self, 'b' if flag == 'a' else 'a', config, **kwargs)
+            finally:
+                self._active.flag = None
+        return flag.upper()
+
+
+class _MemoizedSiblingDataset(MemoizedFetchMixin, _SiblingDataset):
+    pass
+
+
+def test_concurrent_sibling_fetches_do_not_deadlock():
+    dataset = _MemoizedSiblingDataset(threading.Barrier(2))
+    results = dict()
+
+    with memoized_fetch([dataset]):
+        threads = [
+            threading.Thread(target=lambda f=flag: results.setdefault(f, dataset.fetch(f)), daemon=True)
+            for flag in ['a', 'b']
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+
+    assert not any(thread.is_alive() for thread in threads)
+    assert results == {'a': 'A', 'b': 'B'}
+    assert sorted(dataset.computations) == ['a', 'b']
+
+
+def test_sibling_is_fetched_without_concurrent_caller():
+    dataset = _MemoizedSiblingDataset(threading.Barrier(1))
+
+    with memoized_fetch([dataset]) as memos:
+        assert dataset.fetch('a') == 'A'
+        assert dataset.fetch('b') == 'B'
+
+    assert dataset.computations == ['a', 'b']
+    assert memos['base'].hits == 1
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('mesqual')
+pytest.importorskip('mesqual_pypsa')
+
+from studies.study_02_pypsa_eur_example.src.study_database import ParquetDatabase
+
+
+class _Dataset:
+    name = 'base'
+
+
+@pytest.fixture
+def db(tmp_path):
+    return ParquetDatabase(tmp_path)
+
+
+def _round_trip(db, value, flag='countries_t.net_position'):
+    db.set(_Dataset(), flag, None, value)
+    assert db.key_is_up_to_date(_Dataset(), flag, None)
+    return db.get(_Dataset(), flag, None)
+
+
+def test_series_with_tuple_name(db):
+    columns = pd.MultiIndex.from_tuples([('DE', 'net_exp'), ('FR', 'net_exp')], names=['country', 'variable'])
+    df = pd.DataFrame(np.arange(6, dtype=float).reshape(3, 2), columns=columns)
+    series = df[('DE', 'net_exp')]
+
+    result = _round_trip(db, series)
+
+    assert isinstance(result, pd.Series)
+    pd.testing.assert_series_equal(result, series)
+
+
+def test_datetime_index_keeps_freq(db):
+    index = pd.date_range('2013-01-01', periods=4, freq='h', name='snapshot')
+    df = pd.DataFrame({'DE': [1.0, 2.0, 3.0, 4.0]}, index=index)
+
+    result = _round_trip(db, df)
+
+    assert result.index.freq == index.freq
+    pd.testing.assert_frame_equal(result, df)
+
+
+def _frame(seed: int) -> pd.DataFrame:
+    return pd.DataFrame(np.random.default_rng(seed).random((1_000, 2)), columns=['DE', 'FR'])
+
+
+def test_checked_entry_is_not_evicted_before_it_is_read(tmp_path):
+    db = ParquetDatabase(tmp_path, max_bytes='50KB')
+    dataset = _Dataset()
+    db.set(dataset, 'a', None, _frame(0))
+
+    assert db.key_is_up_to_date(dataset, 'a', None)
+    db.set(dataset, 'b', None, _frame(1))  # pushes the folder over budget, e.g. from another thread
+
+    pd.testing.assert_frame_equal(db.get(dataset, 'a', None), _frame(0))
+    db.set(dataset, 'c', None, _frame(2))
+    assert not db.key_is_up_to_date(dataset, 'a', None)
+
+
+def test_legacy_files_count_against_the_budget(tmp_path):
+    legacy_file = tmp_path.joinpath('base_old_entry.pickle')
+    legacy_file.write_bytes(b'0' * 40_000)
+
+    db = ParquetDatabase(tmp_path, max_bytes='50KB')
+    assert db.cache_index.legacy_files() == [legacy_file]
+
+    db.set(_Dataset(), 'a', None, _frame(0))
+    assert not legacy_file.exists()
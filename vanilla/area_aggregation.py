@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+
+class SparseAreaAggregator:
+    """
+    Aggregates node-level time series (snapshots × nodes) to areas via a sparse node→area incidence matrix.
+
+    The incidence matrix is built once from the node→area mapping and then reused for every aggregation,
+    which turns the usual `prepend_model_prop_levels(...).T.groupby(...).sum().T` chain into a single
+    sparse matrix product on the underlying NumPy array, without transposing or copying labelled frames.
+
+    Args:
+        node_to_area: Series mapping node names (index) to area names (values). Nodes without area are ignored.
+
+    Examples:
+        >>> agg = SparseAreaAggregator(bus_model_df['country'])
+        >>> load_per_country = agg.sum(load_per_bus_ts)
+        >>> price_per_country = agg.weighted_mean(price_per_bus_ts, load_per_bus_ts)
+    """
+
+    def __init__(self, node_to_area: pd.Series):
+        node_to_area = node_to_area.dropna()
+        self.node_to_area = node_to_area
+        self.nodes = node_to_area.index
+        area_codes, self.areas = pd.factorize(node_to_area, sort=True)
+        self.areas = pd.Index(self.areas, name=node_to_area.name)
+        num_nodes = len(self.nodes)
+        self._incidence = sp.csr_matrix(
+            (np.ones(num_nodes), (np.arange(num_nodes), area_codes)),
+            shape=(num_nodes, len(self.areas)),
+        )
+
+    def matches(self, node_to_area: pd.Series) -> bool:
+        """Whether the aggregator was built for the given node→area mapping and can be reused."""
+        return self.node_to_area.equals(node_to_area.dropna())
+
+    def sum(self, node_df: pd.DataFrame) -> pd.DataFrame:
+        """Sum of all node columns per area. NaN values are treated as 0, like in groupby().sum()."""
+        values, incidence = self._aligned_values_and_incidence(node_df)
+        return self._to_area_frame(incidence.T @ values.T, node_df.index)
+
+    def weighted_mean(
+            self,
+            values_df: pd.DataFrame,
+            weights_df: pd.DataFrame,
+            fallback_to_mean: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Weighted mean per area, e.g. the demand-volume-weighted price from nodal prices and nodal loads.
+
+        Args:
+            values_df: Node values (snapshots × nodes).
+            weights_df: Node weights (snapshots × nodes), aligned to values_df on both axes.
+            fallback_to_mean: For snapshots in which the weights of an area sum to 0, use the unweighted mean
+                of the area's nodes instead of returning NaN.
+        """
+        weights_df = weights_df.reindex(index=values_df.index, columns=values_df.columns, fill_value=0)
+        values, incidence = self._aligned_values_and_incidence(values_df)
+        weights, _ = self._aligned_values_and_incidence(weights_df)
+
+        weighted_sum = incidence.T @ (values * weights).T
+        weight_sum = incidence.T @ weights.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = weighted_sum / weight_sum
+            if fallback_to_mean:
+                unweighted = (incidence.T @ values.T) / np.asarray(incidence.sum(axis=0)).reshape(-1, 1)
+                result = np.where(weight_sum == 0, unweighted, result)
+        return self._to_area_frame(result, values_df.index)
+
+    def _aligned_values_and_incidence(self, node_df: pd.DataFrame) -> tuple[np.ndarray, sp.csr_matrix]:
+        values = node_df.to_numpy(dtype=float)
+        if np.isnan(values).any():
+            values = np.nan_to_num(values, nan=0.0)
+        if node_df.columns.equals(self.nodes):
+            return values, self._incidence
+
+        positions = self.nodes.get_indexer(node_df.columns)
+        known = positions >= 0
+        if not known.all():
+            values = values[:, known]
+            positions = positions[known]
+        return values, self._incidence[positions]
+
+    def _to_area_frame(self, area_x_snapshot: np.ndarray, index: pd.Index) -> pd.DataFrame:
+        return pd.DataFrame(np.asarray(area_x_snapshot).T, index=index, columns=self.areas)
+
+
+class SparseAreaAggregatorCache:
+    """
+    Keeps one SparseAreaAggregator per mapping name (e.g. 'bus', 'country') and rebuilds it only if the mapping changed.
+
+    Interpreters hold one cache per instance, so the incidence matrices are built once per dataset.
+    """
+
+    def __init__(self):
+        self._aggregators: dict[str, SparseAreaAggregator] = dict()
+
+    def get(self, node_to_area: pd.Series) -> SparseAreaAggregator:
+        aggregator = self._aggregators.get(node_to_area.name)
+        if aggregator is None or not aggregator.matches(node_to_area):
+            aggregator = SparseAreaAggregator(node_to_area)
+            self._aggregators[node_to_area.name] = aggregator
+        return aggregator
+
+
+class ColumnGroupReducer:
+    """
+    Sums the columns of a frame per group with np.add.reduceat, using precomputed integer index arrays.
+
+    The column permutation and group boundaries are derived once from the column→group mapping.
+    Applying the reducer to a frame with the same columns is then a single take + reduceat on the NumPy array.
+
+    Args:
+        columns: Exact column index of the frames the reducer will be applied to.
+        column_to_group: Series mapping column labels to group labels. Columns without group are dropped.
+    """
+
+    def __init__(self, columns: pd.Index, column_to_group: pd.Series):
+        self.columns = columns
+        codes, uniques = pd.factorize(column_to_group.reindex(columns), sort=True)
+        known_positions = np.flatnonzero(codes >= 0)
+        order = np.argsort(codes[known_positions], kind='stable')
+        self._take = known_positions[order]
+        sorted_codes = codes[self._take]
+        if len(sorted_codes):
+            self._starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        else:
+            self._starts = np.array([], dtype=int)
+        self.groups = pd.Index(uniques[sorted_codes[self._starts]], name=column_to_group.name)
+
+    def sum(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Sum per group. NaN values are treated as 0, like in groupby().sum()."""
+        if not df.columns.equals(self.columns):
+            raise ValueError('The reducer was built for a different column index.')
+        if len(self._take) == 0:
+            return pd.DataFrame(index=df.index, columns=self.groups, dtype=float)
+        values = df.to_numpy()[:, self._take]
+        if np.isnan(values).any():
+            values = np.nan_to_num(values, nan=0.0)
+        return pd.DataFrame(np.add.reduceat(values, self._starts, axis=1), index=df.index, columns=self.groups)
@@ -0,0 +1,80 @@
+from typing import Callable, Sequence
+
+import numpy as np
+
+_HEX_BYTES = np.array([f'{i:02x}' for i in range(256)])
+
+
+def hex_to_rgb(colors: Sequence[str]) -> np.ndarray:
+    """Parses '#rrggbb' colors into an (n, 3) float array."""
+    return np.array([[int(c[i:i + 2], 16) for i in (1, 3, 5)] for c in colors], dtype=float).reshape(-1, 3)
+
+
+def rgb_to_hex(rgb: np.ndarray) -> np.ndarray:
+    """Formats an (n, 3) RGB array as an array of '#rrggbb' strings."""
+    rgb = np.clip(np.rint(rgb), 0, 255).astype(int)
+    hex_colors = np.char.add('#', _HEX_BYTES[rgb[:, 0]])
+    hex_colors = np.char.add(hex_colors, _HEX_BYTES[rgb[:, 1]])
+    return np.char.add(hex_colors, _HEX_BYTES[rgb[:, 2]])
+
+
+def contrast_text_colors(
+        background_rgb: np.ndarray,
+        dark_background_text: str = '#F2F2F2',
+        light_background_text: str = '#194D6C',
+        threshold: float = 150,
+) -> np.ndarray:
+    """Picks a readable text color for each background color, based on its perceived brightness."""
+    brightness = background_rgb @ np.array([0.299, 0.587, 0.114])
+    return np.where(brightness < threshold, dark_background_text, light_background_text)
+
+
+class VectorizedColorscale:
+    """
+    Vectorized version of a scalar colorscale (e.g. valmap.SegmentedContinuousColorscale).
+
+    The scalar colorscale is sampled once on a dense grid between its breakpoints. Afterwards, any number of
+    values is mapped in one array operation by linear interpolation between the sampled RGB colors. Values
+    outside the breakpoints get the color of the nearest end, NaNs get the colorscale's NaN color.
+
+    Args:
+        colorscale: Callable that maps a single value to a '#rrggbb' color.
+        breakpoints: Increasing segment bounds of the colorscale, e.g. (0, 100) for a single segment.
+            Each segment is sampled separately, so color jumps at segment bounds are preserved.
+        num_samples: Number of samples per segment.
+
+    Examples:
+        >>> price_scale = VectorizedColorscale(price_colormap, breakpoints=(0, 100))
+        >>> colors = price_scale(np.array([12.3, 55.0, np.nan]))
+    """
+
+    def __init__(self, colorscale: Callable[[float], str], breakpoints: Sequence[float], num_samples: int = 256):
+        breakpoints = list(breakpoints)
+        if len(breakpoints) < 2 or any(lo >= hi for lo, hi in zip(breakpoints[:-1], breakpoints[1:])):
+            raise ValueError(f'breakpoints must contain at least two increasing values; got {breakpoints}.')
+
+        samples = []
+        for lo, hi in zip(breakpoints[:-1], breakpoints[1:]):
+            x = np.linspace(lo, hi, num_samples)
+            if samples:
+                x[0] = np.nextafter(lo, hi)  # the previous segment ends at lo
+            samples.append(x)
+        self._x = np.concatenate(samples)
+        self._rgb = hex_to_rgb([colorscale(v) for v in self._x])
+        self._nan_rgb = hex_to_rgb([colorscale(np.nan)])[0]
+
+    def rgb(self, values) -> np.ndarray:
+        """Maps the values to an (n, 3) RGB array."""
+        values = np.asarray(values, dtype=float).ravel()
+        is_nan = np.isnan(values)
+        position = np.interp(np.where(is_nan, self._x[0], values), self._x, np.arange(len(self._x)))
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(lower + 1, len(self._x) - 1)
+        weight = (position - lower)[:, None]
+        rgb = self._rgb[lower] * (1 - weight) + self._rgb[upper] * weight
+        rgb[is_nan] = self._nan_rgb
+        return rgb
+
+    def __call__(self, values) -> np.ndarray:
+        """Maps the values to an array of '#rrggbb' colors."""
+        return rgb_to_hex(self.rgb(values))
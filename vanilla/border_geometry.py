@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+
+def compute_border_geometries(
+        area_gdf: gpd.GeoDataFrame,
+        area_from: pd.Series,
+        area_to: pd.Series,
+        touch_tolerance: float = 0.0,
+) -> pd.DataFrame:
+    """
+    Computes the geometry columns of an area border model for all borders at once with shapely 2 array operations.
+
+    For borders between touching areas (is_physical), geo_line_string is the shared boundary and projection_point
+    its midpoint. For all other borders, and for areas that only touch in single points, geo_line_string is the
+    straight line between the areas' projection points and projection_point its midpoint. azimuth_angle is the
+    bearing (degrees clockwise from north) from the source area's projection point to the target area's
+    projection point.
+
+    Note that these definitions differ from mesqual's AreaBorderGeometryCalculator in two respects:
+    non-physical borders are drawn as straight lines between the areas' projection points, and azimuth_angle
+    is the bearing between the projection points rather than being derived from the border line. Both agree on
+    is_physical, on the shared border line of physical borders, and on the orientation of azimuth_angle (pointing
+    from the source towards the target area). tests/test_border_geometry.py checks these against
+    AreaBorderGeometryCalculator. Because of the differences, the function is opt-in where it replaces the
+    calculator (CountryBordersModelInterpreter.use_vectorized_geometry).
+
+    Args:
+        area_gdf: Area geometries, indexed by area name. An optional 'projection_point' column is used as
+            representative point of each area; otherwise shapely.point_on_surface is used.
+        area_from: Source area per border (index = border names).
+        area_to: Target area per border, aligned to area_from.
+        touch_tolerance: Distance (in CRS units) up to which two areas count as touching.
+
+    Returns:
+        DataFrame indexed like area_from with columns is_physical, geo_line_string, projection_point, azimuth_angle.
+    """
+    geoms_from = area_gdf.geometry.reindex(area_from.values).to_numpy()
+    geoms_to = area_gdf.geometry.reindex(area_to.values).to_numpy()
+    if 'projection_point' in area_gdf.columns:
+        rep_points = gpd.GeoSeries(area_gdf['projection_point'])
+    else:
+        rep_points = gpd.GeoSeries(shapely.point_on_surface(area_gdf.geometry.to_numpy()), index=area_gdf.index)
+    points_from = rep_points.reindex(area_from.values).to_numpy()
+    points_to = rep_points.reindex(area_to.values).to_numpy()
+
+    if touch_tolerance > 0:
+        is_physical = shapely.dwithin(geoms_from, geoms_to, touch_tolerance)
+    else:
+        is_physical = shapely.intersects(geoms_from, geoms_to)
+
+    xy_from = shapely.get_coordinates(points_from)
+    xy_to = shapely.get_coordinates(points_to)
+    connecting_lines = shapely.linestrings(np.stack([xy_from, xy_to], axis=1))
+
+    shared_boundaries = np.full(len(area_from), None, dtype=object)
+    if is_physical.any():
+        shared = shapely.intersection(shapely.boundary(geoms_from[is_physical]), shapely.boundary(geoms_to[is_physical]))
+        shared_boundaries[is_physical] = shapely.line_merge(_line_parts(shared))
+    has_shared_line = is_physical & ~shapely.is_empty(shared_boundaries) & ~shapely.is_missing(shared_boundaries)
+    geo_line_strings = np.where(has_shared_line, shared_boundaries, connecting_lines)
+
+    projection_points = shapely.line_interpolate_point(geo_line_strings, 0.5, normalized=True)
+
+    dx = xy_to[:, 0] - xy_from[:, 0]
+    dy = xy_to[:, 1] - xy_from[:, 1]
+    azimuth_angles = np.degrees(np.arctan2(dx, dy)) % 360
+
+    return pd.DataFrame(
+        {
+            'is_physical': is_physical,
+            'geo_line_string': geo_line_strings,
+            'projection_point': projection_points,
+            'azimuth_angle': azimuth_angles,
+        },
+        index=area_from.index,
+    )
+
+
+def _line_parts(geometries: np.ndarray) -> np.ndarray:
+    """
+    Reduces each geometry to a MultiLineString of its line parts (boundary intersections may contain points).
+
+    Geometries without any line part (e.g. areas that only touch in a corner) become empty MultiLineStrings.
+    """
+    result = np.full(len(geometries), shapely.from_wkt('MULTILINESTRING EMPTY'), dtype=object)
+    parts, owner = shapely.get_parts(geometries, return_index=True)
+    is_line = np.isin(shapely.get_type_id(parts), [1, 2])  # LineString, LinearRing
+    if not is_line.any():
+        return result
+    # multilinestrings expects consecutive indices 0..n-1, so owners without line parts must not leave gaps
+    owners_with_lines, dense_owner = np.unique(owner[is_line], return_inverse=True)
+    result[owners_with_lines] = shapely.multilinestrings(parts[is_line], indices=dense_owner)
+    return result
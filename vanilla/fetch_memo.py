@@ -0,0 +1,150 @@
+import pickle
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator
+
+if TYPE_CHECKING:
+    from mesqual.datasets import Dataset
+    from mesqual.typevars import FlagType
+
+
+def config_key(config) -> Any:
+    """Content-based key of a fetch config, so equal configs created per fetch (effective configs) share entries."""
+    if config is None:
+        return None
+    try:
+        return pickle.dumps(config)
+    except Exception:
+        return id(config)
+
+
+class FetchMemo:
+    """
+    In-memory results of distinct fetch calls with in-flight deduplication.
+
+    The first caller of a key computes the result; concurrent callers of the same key wait for it instead of
+    computing it again. Failed computations are not memoized, their exception is raised in all waiting callers.
+    """
+
+    def __init__(self):
+        self._futures: dict[tuple, Future] = dict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: tuple, compute: Callable[[], Any], wait: bool = True) -> Any:
+        """
+        Result of the key, computed by the first caller.
+
+        With wait=False, returns None instead of waiting if another caller is still computing the key. This is
+        for optional fetches from within a computation (e.g. of sibling flags), which must not wait for a
+        computation that may itself be waiting for the caller.
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._futures[key] = future
+                self.misses += 1
+            elif not wait and not future.done():
+                return None
+            else:
+                self.hits += 1
+        if not is_owner:
+            return future.result()
+
+        try:
+            future.set_result(compute())
+        except BaseException as e:
+            with self._lock:
+                del self._futures[key]
+            future.set_exception(e)
+        return future.result()
+
+
+class MemoizedFetchMixin:
+    """
+    Dataset mixin that serves repeated fetches from a FetchMemo while one is active (see memoized_fetch).
+
+    Without an active memo, fetch behaves exactly like the dataset's regular fetch. Since interpreters fetch
+    their inputs via parent_dataset.fetch, the memo also covers the fetches of dependent interpreters.
+
+    Examples:
+        >>> class StudyDataset(MemoizedFetchMixin, PyPSADataset):
+        ...     pass
+    """
+    _fetch_memo: FetchMemo | None = None
+
+    def fetch(self, flag: 'FlagType', config=None, **kwargs):
+        memo = self._fetch_memo
+        if memo is None:
+            return super().fetch(flag, config, **kwargs)
+        key = (flag, config_key(config), repr(sorted(kwargs.items())))
+        return memo.get_or_compute(key, lambda: super(MemoizedFetchMixin, self).fetch(flag, config, **kwargs))
+
+    def fetch_unless_in_flight(self, flag: 'FlagType', config=None, **kwargs):
+        """Like fetch, but returns None instead of waiting if the same fetch is in progress in another call."""
+        memo = self._fetch_memo
+        if memo is None:
+            return super().fetch(flag, config, **kwargs)
+        key = (flag, config_key(config), repr(sorted(kwargs.items())))
+        return memo.get_or_compute(
+            key,
+            lambda: super(MemoizedFetchMixin, self).fetch(flag, config, **kwargs),
+            wait=False,
+        )
+
+    def activate_fetch_memo(self) -> FetchMemo | None:
+        """Starts a new memo. Returns None if one is already active, e.g. from an enclosing memoized_fetch."""
+        if self._fetch_memo is not None:
+            return None
+        self._fetch_memo = FetchMemo()
+        return self._fetch_memo
+
+    def release_fetch_memo(self) -> None:
+        self._fetch_memo = None
+
+
+@contextmanager
+def memoized_fetch(datasets: Iterable['Dataset']) -> Iterator[dict[str, FetchMemo]]:
+    """
+    Within the context, every distinct fetch of the given datasets is evaluated only once.
+
+    Only datasets with the MemoizedFetchMixin are memoized; other datasets fetch as usual. This includes the
+    fetches of interpreters (via parent_dataset.fetch) and of KPI definitions, so a flag needed by hundreds of
+    per-object KPIs is read from the database or computed once per dataset, also if several threads need it
+    at the same time. The memo is dropped when the context is left.
+
+    Yields:
+        Dict of dataset name to its memo, e.g. to inspect hits / misses.
+    """
+    activated = []
+    memos = dict()
+    try:
+        for ds in datasets:
+            if not isinstance(ds, MemoizedFetchMixin):
+                continue
+            memo = ds.activate_fetch_memo()
+            if memo is None:
+                continue  # already memoized by an enclosing context
+            activated.append(ds)
+            memos[ds.name] = memo
+        yield memos
+    finally:
+        for ds in activated:
+            ds.release_fetch_memo()
+
+
+def fetch_unless_in_flight(dataset: 'Dataset', flag: 'FlagType', config=None, **kwargs):
+    """
+    Fetches the flag unless the same fetch is already in progress on a memoized dataset (then returns None).
+
+    Interpreters that fetch a sibling flag to populate the database use this instead of dataset.fetch: with
+    an active memo, the sibling may be computed by another thread that in turn waits for the interpreter's own
+    flag, and waiting for it would deadlock. The other computation stores the sibling anyway.
+    """
+    if isinstance(dataset, MemoizedFetchMixin):
+        return dataset.fetch_unless_in_flight(flag, config, **kwargs)
+    return dataset.fetch(flag, config, **kwargs)
@@ -0,0 +1,89 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable
+
+from vanilla.fetch_memo import memoized_fetch
+
+if TYPE_CHECKING:
+    from mesqual.datasets import Dataset
+    from mesqual.typevars import FlagType
+
+
+class FetchPlanner:
+    """
+    Plans and runs the fetches needed for a set of target flags, based on the interpreters' declared dependencies.
+
+    The dependency graph is built from dataset.required_flags_for_flag (i.e. the interpreters'
+    _required_flags_for_flag declarations) and split into topological levels: every flag only depends on flags
+    of earlier levels. Each dataset fetches its flags level by level on its own thread, and the datasets run
+    concurrently on a thread pool. During the prefetch, a fetch memo (see vanilla.fetch_memo) serves repeated
+    fetches of the same flag, e.g. by dependent interpreters, so each flag is computed once per dataset.
+    After the prefetch, only the flags that the dataset's database persists are served from it; flags it
+    doesn't persist (e.g. buses_t.load_p in the StudyDatabase) are computed again on their next fetch, unless
+    the prefetch and the later fetches run within one enclosing memoized_fetch.
+
+    The flags of one dataset are deliberately not fetched concurrently: interpreters of the same dataset share
+    state (e.g. BranchesP serves branches_t.p0 and branches_t.p1 from one flow block), and concurrent fetches
+    would compute it twice.
+
+    Args:
+        max_workers: Number of threads. Defaults to the number of datasets, capped at the CPU count.
+
+    Examples:
+        >>> planner = FetchPlanner()
+        >>> levels = planner.plan(ds, ['countries_t.net_position'])  # raw PyPSA flags first, the target last
+        >>> planner.prefetch(study.scen.datasets, ['countries_t.net_position', 'country_borders_t.net_flow'])
+    """
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers
+
+    @staticmethod
+    def build_graph(dataset: 'Dataset', target_flags: Iterable['FlagType']) -> dict['FlagType', set['FlagType']]:
+        """Maps each flag needed for the target flags to the flags it directly depends on."""
+        graph: dict['FlagType', set['FlagType']] = dict()
+        to_visit = list(target_flags)
+        while to_visit:
+            flag = to_visit.pop()
+            if flag in graph:
+                continue
+            graph[flag] = set(dataset.required_flags_for_flag(flag))
+            to_visit.extend(graph[flag] - graph.keys())
+        return graph
+
+    @staticmethod
+    def topological_levels(graph: dict['FlagType', set['FlagType']]) -> list[list['FlagType']]:
+        """Groups the flags of the graph into levels that only depend on flags of earlier levels."""
+        remaining = {flag: set(deps) & graph.keys() for flag, deps in graph.items()}
+        levels = []
+        while remaining:
+            level = sorted((f for f, deps in remaining.items() if not deps), key=str)
+            if not level:
+                raise ValueError(f'Cyclic flag dependencies between: {sorted(remaining, key=str)}')
+            levels.append(level)
+            for flag in level:
+                del remaining[flag]
+            for deps in remaining.values():
+                deps.difference_update(level)
+        return levels
+
+    def plan(self, dataset: 'Dataset', target_flags: Iterable['FlagType']) -> list[list['FlagType']]:
+        return self.topological_levels(self.build_graph(dataset, target_flags))
+
+    def prefetch(self, datasets: Iterable['Dataset'], target_flags: Iterable['FlagType'], **kwargs) -> None:
+        """Fetches the target flags and all their dependencies for all datasets, each dataset level by level."""
+        target_flags = list(target_flags)
+        plans = [(ds, self.plan(ds, target_flags)) for ds in datasets]
+        if not plans:
+            return
+        max_workers = self.max_workers or min(len(plans), os.cpu_count() or 1)
+
+        def _fetch_levels(plan: tuple['Dataset', list[list['FlagType']]]) -> None:
+            ds, levels = plan
+            for level in levels:
+                for flag in level:
+                    ds.fetch(flag, **kwargs)
+
+        with memoized_fetch([ds for ds, _ in plans]):
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(_fetch_levels, plans))  # consumes the results to re-raise exceptions of the workers
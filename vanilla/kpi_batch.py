@@ -0,0 +1,37 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from vanilla.fetch_memo import memoized_fetch
+from vanilla.parallel_fetch import get_scenario_datasets
+
+
+def add_kpis_in_batch(collection, definitions: list, max_workers: int = None) -> None:
+    """
+    Batched version of collection.add_kpis_from_definitions_to_all_child_datasets(definitions).
+
+    The KPIs of all child datasets are evaluated concurrently (one thread per dataset), while a fetch memo
+    on all involved datasets (incl. the inputs of comparisons) makes sure that each flag is fetched only once
+    per dataset instead of once per KPI, also if several threads need it at the same time. The memo only
+    applies to datasets with the MemoizedFetchMixin (see vanilla.fetch_memo).
+
+    Only the fetches are batched: each definition still reduces its own object column, since mesqual's KPI
+    definitions have no hook for precomputed values. Interpreters that fetch sibling flags must do so with
+    fetch_unless_in_flight, as the threads of the batch share the memo.
+
+    Args:
+        collection: Dataset collection, e.g. study.scen or study.comp.
+        definitions: KPI definitions, e.g. from kpis.FlagAggKPIBuilder().build().
+        max_workers: Number of threads. Defaults to the number of datasets, capped at the CPU count.
+    """
+    child_datasets = collection.datasets
+    child_datasets = list(child_datasets.values() if isinstance(child_datasets, dict) else child_datasets)
+    if not child_datasets:
+        return
+    involved = {id(ds): ds for ds in child_datasets + get_scenario_datasets(collection)}
+    if max_workers is None:
+        max_workers = min(len(child_datasets), os.cpu_count() or 1)
+
+    with memoized_fetch(involved.values()):
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # consumes the results to re-raise exceptions of the workers
+            list(executor.map(lambda ds: ds.add_kpis_from_definitions(definitions), child_datasets))
@@ -0,0 +1,151 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    import pypsa
+
+
+def _read_network(file_path: str) -> 'pypsa.Network':
+    import pypsa
+    return pypsa.Network(file_path)
+
+
+def load_networks_in_parallel(
+        file_paths: Iterable[str | Path],
+        max_workers: int | None = None,
+) -> list['pypsa.Network']:
+    """
+    Reads multiple PyPSA NetCDF files concurrently in a process pool.
+
+    Parsing a NetCDF file into a pypsa.Network is CPU-bound, so the files are read in separate
+    worker processes and the resulting networks are sent back to the calling process.
+    The order of the returned networks matches the order of the given file paths.
+
+    Args:
+        file_paths: Paths to the .nc files to read.
+        max_workers: Number of worker processes. Defaults to the number of files, capped at the CPU count.
+            A value of 1 reads all files sequentially in the calling process without spawning a pool.
+
+    Returns:
+        List of pypsa.Network objects in the same order as file_paths.
+    """
+    file_paths = [str(p) for p in file_paths]
+    if max_workers is None:
+        max_workers = min(len(file_paths), os.cpu_count() or 1)
+
+    if max_workers <= 1 or len(file_paths) <= 1:
+        return [_read_network(p) for p in file_paths]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_read_network, file_paths))
+
+
+class LazyNetworkPool:
+    """
+    Keeps track of the LazyNetwork instances that currently hold a parsed network in memory.
+
+    Whenever more than max_loaded_networks networks are loaded at the same time, the least recently used ones
+    are evicted again. Evicted networks are transparently re-read from disk on their next access.
+
+    Args:
+        max_loaded_networks: Maximum number of networks that may be held in memory at the same time.
+    """
+
+    def __init__(self, max_loaded_networks: int):
+        if max_loaded_networks < 1:
+            raise ValueError(f'max_loaded_networks must be at least 1, got {max_loaded_networks}.')
+        self.max_loaded_networks = max_loaded_networks
+        self._loaded: OrderedDict[int, 'LazyNetwork'] = OrderedDict()
+        self._lock = threading.RLock()
+
+    @property
+    def loaded_networks(self) -> list['LazyNetwork']:
+        with self._lock:
+            return list(self._loaded.values())
+
+    def touch(self, network: 'LazyNetwork') -> None:
+        with self._lock:
+            key = id(network)
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                return
+            self._loaded[key] = network
+            while len(self._loaded) > self.max_loaded_networks:
+                _, lru_network = self._loaded.popitem(last=False)
+                lru_network.evict()
+
+    def discard(self, network: 'LazyNetwork') -> None:
+        with self._lock:
+            self._loaded.pop(id(network), None)
+
+    def evict_all(self) -> None:
+        for network in self.loaded_networks:
+            network.evict()
+
+
+class LazyNetwork:
+    """
+    Stand-in for a pypsa.Network that only parses the NetCDF file on first attribute access.
+
+    The proxy can be passed to a PyPSADataset in place of a network. Every attribute lookup is forwarded
+    to the underlying pypsa.Network, which is read from file_path the first time it is needed.
+    With evict(), the parsed network can be dropped again to free memory; it will be re-read on the next access.
+
+    Args:
+        file_path: Path to the .nc file of the network.
+        pool: Optional LazyNetworkPool that limits how many networks are held in memory at the same time.
+
+    Examples:
+        >>> n = LazyNetwork('dvc/networks/base.nc')
+        >>> n.is_loaded
+        False
+        >>> n.buses  # triggers the file read
+        >>> n.evict()
+    """
+
+    def __init__(self, file_path: str | Path, pool: LazyNetworkPool = None):
+        self._file_path = str(file_path)
+        self._pool = pool
+        self._network = None
+        self._lock = threading.Lock()
+
+    @property
+    def file_path(self) -> str:
+        return self._file_path
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._network is not None
+
+    def load(self) -> 'pypsa.Network':
+        network = self._network
+        if network is None:
+            with self._lock:
+                if self._network is None:
+                    self._network = _read_network(self._file_path)
+                network = self._network
+        if self._pool is not None:
+            self._pool.touch(self)
+        return network
+
+    def evict(self) -> None:
+        with self._lock:
+            self._network = None
+        if self._pool is not None:
+            self._pool.discard(self)
+
+    def __getattr__(self, item: str):
+        if item in _LAZY_NETWORK_SLOTS:
+            raise AttributeError(item)
+        return getattr(self.load(), item)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.is_loaded else 'not loaded'
+        return f'LazyNetwork({self._file_path!r}, {state})'
+
+
+_LAZY_NETWORK_SLOTS = frozenset({'_file_path', '_pool', '_network', '_lock'})
@@ -0,0 +1,99 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Iterable
+
+import pandas as pd
+
+from vanilla.fetch_memo import MemoizedFetchMixin, memoized_fetch
+
+if TYPE_CHECKING:
+    from mesqual.datasets import Dataset
+    from mesqual.typevars import FlagType
+
+
+def get_scenario_datasets(collection) -> list['Dataset']:
+    """
+    The unique scenario datasets a collection fetches from, including the inputs of its comparisons.
+
+    Walks nested collections (e.g. study.scen_comp) and resolves comparison datasets into their variation and
+    reference datasets, so every scenario appears once no matter how many comparisons use it.
+    """
+    unique: dict[int, 'Dataset'] = dict()
+
+    def _collect(obj) -> None:
+        if _is_comparison(obj):
+            _collect(obj.variation_dataset)
+            _collect(obj.reference_dataset)
+        elif getattr(obj, 'datasets', None) is not None:
+            children = obj.datasets.values() if isinstance(obj.datasets, dict) else obj.datasets
+            for child in children:
+                _collect(child)
+        else:
+            unique.setdefault(id(obj), obj)
+
+    _collect(collection)
+    return list(unique.values())
+
+
+def _is_comparison(obj) -> bool:
+    return hasattr(obj, 'variation_dataset') and hasattr(obj, 'reference_dataset')
+
+
+def warm_up_in_parallel(
+        datasets: Iterable['Dataset'],
+        flags: Iterable['FlagType'],
+        max_workers: int = None,
+        **kwargs,
+) -> None:
+    """Fetches the given flags for each dataset on a thread pool, one task per dataset."""
+    datasets = list(datasets)
+    flags = list(flags)
+    if not datasets:
+        return
+    if max_workers is None:
+        max_workers = min(len(datasets), os.cpu_count() or 1)
+
+    def _fetch_all(dataset: 'Dataset') -> None:
+        for flag in flags:
+            dataset.fetch(flag, **kwargs)
+
+    if max_workers <= 1:
+        for ds in datasets:
+            _fetch_all(ds)
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(_fetch_all, datasets))  # consumes the results to re-raise exceptions of the workers
+
+
+def fetch_in_parallel(collection, flag: 'FlagType', max_workers: int = None, **kwargs) -> pd.DataFrame:
+    """
+    Parallel version of collection.fetch(flag) for study.scen, study.comp and study.scen_comp.
+
+    Within a fetch memo on all scenario datasets (see vanilla.fetch_memo), the flag is first evaluated once per
+    unique scenario on a thread pool, including the scenarios that are only needed as inputs of comparisons.
+    The regular collection.fetch then gets these results from the memo (scenario children as well as the
+    variation / reference fetches of comparison children), computes the comparison deltas and concatenates
+    everything in the usual format. Each scenario is thus evaluated exactly once, whether or not the flag is
+    stored in a database.
+
+    Only datasets with the MemoizedFetchMixin (e.g. the StudyDataset of study 02) are evaluated on the pool;
+    for other datasets the results could not be handed over, so they are fetched by collection.fetch as usual.
+
+    A thread pool is used because datasets hold their network in memory and cannot be sent to worker processes;
+    the heavy pandas / NumPy work of the interpreters releases the GIL for most of its runtime.
+
+    Args:
+        collection: A dataset collection, e.g. study.scen_comp.
+        flag: Flag to fetch.
+        max_workers: Number of threads. Defaults to the number of scenarios, capped at the CPU count.
+        **kwargs: Passed on to fetch.
+
+    Examples:
+        >>> data = fetch_in_parallel(study.scen_comp, 'countries_t.trade_balance_per_partner')
+    """
+    scenarios = get_scenario_datasets(collection)
+    with memoized_fetch(scenarios):
+        memoized = [ds for ds in scenarios if isinstance(ds, MemoizedFetchMixin)]
+        warm_up_in_parallel(memoized, [flag], max_workers=max_workers, **kwargs)
+        return collection.fetch(flag, **kwargs)
@@ -0,0 +1,238 @@
+import json
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+from branca.element import MacroElement, Template
+
+
+def compact_geojson(
+        geometries: gpd.GeoSeries,
+        simplify_tolerance: float = 0.01,
+        precision: int = 3,
+) -> list[dict]:
+    """
+    Simplified GeoJSON geometries with coordinates rounded to the given number of decimals.
+
+    With the default settings (degrees in EPSG:4326), vertices closer than ~1 km are merged and coordinates
+    are written with ~100 m resolution, which is more than enough for country-level maps.
+    """
+    geoms = geometries.to_crs(epsg=4326).values if geometries.crs is not None else geometries.values
+    geoms = shapely.simplify(np.asarray(geoms), simplify_tolerance, preserve_topology=True)
+    geoms = shapely.transform(geoms, lambda coords: np.round(coords, precision))
+    return [json.loads(g) for g in shapely.to_geojson(geoms)]
+
+
+def _point_coords(points: pd.Series, precision: int) -> list[list[float]]:
+    """[lat, lon] pairs as expected by Leaflet markers."""
+    points = np.asarray(points.values)
+    return np.round(np.column_stack([shapely.get_y(points), shapely.get_x(points)]), precision).tolist()
+
+
+class SharedGeoJsonLayer(MacroElement):
+    """
+    Multi-group map layer that contains every geometry only once and restyles it client-side per group.
+
+    The regular folviz generators render a full copy of all areas, labels and arrows for every feature group,
+    so the HTML grows linearly with the number of groups. This layer writes the simplified / quantized area
+    geometries, label and arrow positions once; each group only adds compact per-object style arrays
+    (palette indices for colors, rounded values and sizes). A select box on the map switches between groups
+    and restyles the shared Leaflet layers in the browser.
+
+    Args:
+        areas: Model df of the areas with 'geometry' and 'projection_point' columns; index = object names.
+        arrows: Model df of the arrow objects (e.g. borders) with 'projection_point' and 'azimuth_angle'
+            (degrees clockwise from north, pointing from the first to the second area) columns.
+        simplify_tolerance: Simplification tolerance of the area geometries in degrees.
+        precision: Number of decimals of all coordinates.
+        border_color: Outline color of the areas.
+        border_width: Outline width of the areas.
+        font_size: Font size of the area labels.
+
+    Examples:
+        >>> layer = SharedGeoJsonLayer(countries, country_borders)
+        >>> layer.add_group('Prices - base', area_styles={'DE': dict(fill_color='#AA3300', value=62.1)})
+        >>> layer.add_to(m)
+    """
+    _template = Template(u"""
+        {% macro header(this, kwargs) %}
+            <style>
+                .shared-layer-label { white-space: nowrap; font-weight: bold; transform: translate(-50%, -50%); }
+                .shared-layer-arrow { transform-origin: center center; }
+            </style>
+        {% endmacro %}
+
+        {% macro script(this, kwargs) %}
+            (function() {
+                var data = {{ this.data_json }};
+                var map = {{ this._parent.get_name() }};
+                var palette = data.palette;
+
+                var areaLayers = [];
+                L.geoJSON(data.areas, {
+                    style: function() {
+                        return {color: data.border_color, weight: data.border_width, fillOpacity: 0, opacity: 0};
+                    },
+                    onEachFeature: function(feature, layer) {
+                        areaLayers[feature.id] = layer;
+                        layer.bindTooltip('');
+                    }
+                }).addTo(map);
+
+                function createMarkers(points) {
+                    return points.map(function(point) {
+                        return L.marker(point, {icon: L.divIcon({className: '', html: ''}), interactive: false});
+                    });
+                }
+                var labels = createMarkers(data.label_points);
+                var arrows = createMarkers(data.arrow_points);
+                L.layerGroup(labels).addTo(map);
+                L.layerGroup(arrows).addTo(map);
+
+                function showGroup(index) {
+                    var group = data.groups[index];
+                    areaLayers.forEach(function(layer, i) {
+                        var fill = group.fill_color[i];
+                        var visible = fill !== null;
+                        layer.setStyle({
+                            fillColor: visible ? palette[fill] : null,
+                            fillOpacity: visible ? 1 : 0,
+                            opacity: visible ? 1 : 0
+                        });
+                        layer.setTooltipContent(
+                            group.value[i] !== null ? data.area_names[i] + ': ' + group.value[i] : data.area_names[i]
+                        );
+                    });
+                    labels.forEach(function(marker, i) {
+                        var value = group.value[i];
+                        var html = value === null ? '' :
+                            '<div class="shared-layer-label" style="font-size: ' + data.font_size +
+                            '; color: ' + palette[group.text_color[i]] + ';">' + Math.round(value) + '</div>';
+                        marker.setIcon(L.divIcon({className: '', html: html, iconSize: [0, 0]}));
+                    });
+                    arrows.forEach(function(marker, i) {
+                        var color = group.arrow_color[i];
+                        var html = '';
+                        var size = [0, 0];
+                        if (color !== null) {
+                            var w = group.arrow_width[i], h = group.arrow_height[i];
+                            var angle = data.arrow_angles[i] + (group.arrow_reverse[i] ? 180 : 0);
+                            size = [w, h];
+                            html = '<svg class="shared-layer-arrow" width="' + w + '" height="' + h +
+                                '" viewBox="0 0 10 10" preserveAspectRatio="none" style="transform: rotate(' + angle + 'deg);">' +
+                                '<polygon points="5,0 10,10 5,7 0,10" fill="' + palette[color] + '"/></svg>';
+                        }
+                        marker.setIcon(L.divIcon({className: '', html: html, iconSize: size}));
+                    });
+                }
+
+                var control = L.control({position: 'topleft'});
+                control.onAdd = function() {
+                    var div = L.DomUtil.create('div', 'leaflet-bar');
+                    var select = L.DomUtil.create('select', '', div);
+                    data.groups.forEach(function(group, i) {
+                        var option = L.DomUtil.create('option', '', select);
+                        option.value = i;
+                        option.text = group.name;
+                    });
+                    select.onchange = function() { showGroup(parseInt(select.value)); };
+                    L.DomEvent.disableClickPropagation(div);
+                    return div;
+                };
+                control.addTo(map);
+                if (data.groups.length) { showGroup(0); }
+            })();
+        {% endmacro %}
+    """)
+
+    def __init__(
+            self,
+            areas: gpd.GeoDataFrame,
+            arrows: pd.DataFrame = None,
+            simplify_tolerance: float = 0.01,
+            precision: int = 3,
+            border_color: str = '#ffffff',
+            border_width: float = 2,
+            font_size: str = '10pt',
+    ):
+        super().__init__()
+        self._name = 'SharedGeoJsonLayer'
+        if arrows is None:
+            arrows = pd.DataFrame(columns=['projection_point', 'azimuth_angle'])
+
+        self._area_names = areas.index.to_list()
+        self._arrow_names = arrows.index.to_list()
+        self._area_position = {name: i for i, name in enumerate(self._area_names)}
+        self._arrow_position = {name: i for i, name in enumerate(self._arrow_names)}
+
+        features = [
+            dict(type='Feature', id=i, properties=dict(), geometry=geometry)
+            for i, geometry in enumerate(compact_geojson(areas.geometry, simplify_tolerance, precision))
+        ]
+        self._shared = dict(
+            areas=dict(type='FeatureCollection', features=features),
+            area_names=[str(name) for name in self._area_names],
+            label_points=_point_coords(areas['projection_point'], precision),
+            arrow_points=_point_coords(arrows['projection_point'], precision),
+            arrow_angles=np.round(arrows['azimuth_angle'].to_numpy(dtype=float), 1).tolist(),
+            border_color=border_color,
+            border_width=border_width,
+            font_size=font_size,
+        )
+        self._palette: dict[str, int] = dict()
+        self._groups: list[dict[str, Any]] = []
+
+    def _color_index(self, color: str) -> int:
+        return self._palette.setdefault(color, len(self._palette))
+
+    def add_group(
+            self,
+            name: str,
+            area_styles: dict[str, dict[str, Any]] = None,
+            arrow_styles: dict[str, dict[str, Any]] = None,
+    ) -> 'SharedGeoJsonLayer':
+        """
+        Adds one selectable group. Objects without a style are hidden while the group is shown.
+
+        Args:
+            name: Name shown in the group select box.
+            area_styles: Per area object: fill_color, text_color and value (shown in label and tooltip).
+            arrow_styles: Per arrow object: color, width, height and reverse (flip the arrow direction).
+        """
+        area_styles = area_styles or dict()
+        arrow_styles = arrow_styles or dict()
+        num_areas, num_arrows = len(self._area_names), len(self._arrow_names)
+        group = dict(
+            name=name,
+            fill_color=[None] * num_areas,
+            text_color=[None] * num_areas,
+            value=[None] * num_areas,
+            arrow_color=[None] * num_arrows,
+            arrow_width=[None] * num_arrows,
+            arrow_height=[None] * num_arrows,
+            arrow_reverse=[None] * num_arrows,
+        )
+        for obj, style in area_styles.items():
+            if obj not in self._area_position:
+                continue
+            i = self._area_position[obj]
+            group['fill_color'][i] = self._color_index(style['fill_color'])
+            group['text_color'][i] = self._color_index(style['text_color'])
+            group['value'][i] = None if pd.isna(style['value']) else round(float(style['value']), 2)
+        for obj, style in arrow_styles.items():
+            if obj not in self._arrow_position:
+                continue
+            i = self._arrow_position[obj]
+            group['arrow_color'][i] = self._color_index(style['color'])
+            group['arrow_width'][i] = round(float(style['width']), 1)
+            group['arrow_height'][i] = round(float(style['height']), 1)
+            group['arrow_reverse'][i] = int(bool(style['reverse']))
+        self._groups.append(group)
+        return self
+
+    @property
+    def data_json(self) -> str:
+        data = dict(self._shared, palette=list(self._palette), groups=self._groups)
+        return json.dumps(data, separators=(',', ':'))